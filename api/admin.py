@@ -2,16 +2,70 @@ from django.contrib import admin
 from api.models import (
     VUser, Volunteer, Rating, Comment, Task, Link, Unit
 )
+from api.paginators import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    # Exact COUNT(*) is skipped twice: for the paginator and for the "N total" link
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class SoftDeleteAdmin(admin.ModelAdmin):
+    """
+    Deleting only marks rows, so the confirmation page lists just the selected
+    objects instead of collecting the whole cascade, `purge_deleted` does that later.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        return [str(obj) for obj in objs], {self.model._meta.verbose_name_plural: len(objs)}, set(), []
 
 
 @admin.register(Link)
 class LinkAdmin(admin.ModelAdmin):
     readonly_fields = ('code',)
+    list_display = ('code', 'unit')
+    list_select_related = ('unit',)
+    raw_id_fields = ('unit',)
+
+
+@admin.register(Volunteer)
+class VolunteerAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'link')
+    list_select_related = ('user', 'link')
+    raw_id_fields = ('user', 'link')
+    search_fields = ('^user__username',)
+
+
+@admin.register(Rating)
+class RatingAdmin(LargeTableAdmin):
+    list_select_related = ('volunteer__user', 'task')
+    raw_id_fields = ('task', 'volunteer')
+    search_fields = ('^volunteer__user__username', '^task__title')
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    list_select_related = ('volunteer__user',)
+    raw_id_fields = ('task', 'volunteer')
+    search_fields = ('^volunteer__user__username',)
+
+
+@admin.register(Task)
+class TaskAdmin(SoftDeleteAdmin, LargeTableAdmin):
+    list_display = ('title', 'unit', 'is_open', 'date_start', 'date_end')
+    list_filter = ('is_open',)
+    list_select_related = ('unit',)
+    raw_id_fields = ('creator', 'unit')
+    search_fields = ('^title',)
+
+
+@admin.register(Unit)
+class UnitAdmin(SoftDeleteAdmin):
+    list_display = ('title', 'creator')
+    list_select_related = ('creator',)
+    raw_id_fields = ('creator',)
 
 
 admin.site.register(VUser)
-admin.site.register(Volunteer)
-admin.site.register(Rating)
-admin.site.register(Comment)
-admin.site.register(Task)
-admin.site.register(Unit)
@@ -1,17 +1,36 @@
+import copy
+from datetime import timedelta
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum, F, Window
+from django.db.models.functions import TruncWeek
+from django.http import QueryDict
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import generics
 from rest_framework_simplejwt.views import TokenViewBase
 
-from api.models import Link, Task, Rating, Volunteer, Unit
-from api.permissions import VolunteerPermission
+from api.export import stream_csv, EXPORT_CHUNK_SIZE
+from api.mixins import ConditionalListMixin
+from api.models import Link, Task, Rating, Volunteer, Unit, Comment, UnitDailyStats, dashboard_cache_key
+from api.permissions import VolunteerPermission, UnitMemberPermission
+from api.renderers import CSVRenderer, FastJSONRenderer
 from api.serializers import TaskSerializer, VUserLoginSerializer, VolunteerSerializer, CommentSerializer, \
-    VolunteerReadSerializer, CommentReadSerializer
+    VolunteerReadSerializer, CommentReadSerializer, VolunteerScoreSerializer, UnitWeeklyStatsSerializer, \
+    BatchSerializer, DashboardSerializer
 
 
 class TokenObtainByLink(TokenViewBase):
 
+    throttle_scope = "link_code"
+
     def post(self, request, code, *args, **kwargs):
         serializer = VUserLoginSerializer(data={"code": code})
         if serializer.is_valid():
@@ -33,11 +52,38 @@ class LinkApiView(APIView):
         return Response({"code": link.code}, 201)
 
 
-class VolunteerApi(generics.ListAPIView):
+class VolunteerApi(ConditionalListMixin, generics.ListAPIView):
     serializer_class = VolunteerSerializer
+    ordering = ("total_score", "pk")
+
+    def filter_volunteers(self, queryset):
+        return queryset
 
     def get_queryset(self):
-        return sorted(Volunteer.objects.all(), key=lambda v: v.score)
+        queryset = Volunteer.objects.active().select_related("user").with_score().order_by(*self.ordering)
+        return self.filter_volunteers(queryset)
+
+    def get_list_state(self):
+        # updated_at is touched by user changes too (see api.signals.touch_user_rows),
+        # scores follow the tasks, closing one changes the listing as well
+        return self.filter_volunteers(Volunteer.objects.active()).aggregate(
+            count=Count("pk", distinct=True),
+            last_modified=Max("updated_at"),
+            rating_count=Count("ratings"),
+            last_rating=Max("ratings__pk"),
+            task_modified=Max("ratings__task__updated_at"),
+        )
+
+
+class UnitVolunteerApi(VolunteerApi):
+    """Leaderboard of a single unit, best score first"""
+
+    permission_classes = (UnitMemberPermission,)
+    serializer_class = VolunteerScoreSerializer
+    ordering = ("-total_score", "pk")
+
+    def filter_volunteers(self, queryset):
+        return queryset.filter(link__unit_id=self.kwargs["unit_id"])
 
 
 class MyApi(generics.CreateAPIView):
@@ -64,25 +110,122 @@ class MyApi(generics.CreateAPIView):
         return Response(serializer.errors, status=400)
 
 
-class TaskApi(generics.ListAPIView):
+class MyDashboardApi(generics.GenericAPIView):
+    """
+    Profile, score, rank within the unit and the volunteer's tasks in two
+    queries, the user with volunteer, link and unit comes from authentication.
+    Cached per volunteer, see `api.signals.invalidate_dashboard`.
+    """
+
+    permission_classes = (VolunteerPermission,)
+    serializer_class = DashboardSerializer
+
+    def get(self, request, *args, **kwargs):
+        volunteer, ttl = request.user.volunteer, settings.DASHBOARD_CACHE_TTL
+        key, host = dashboard_cache_key(volunteer.pk), request.get_host()
+        cached = cache.get(key) if ttl else None
+        # Photo and avatar urls are absolute, a different host renders them again
+        if cached is not None and cached[0] == host:
+            return Response(cached[1], 200)
+
+        data = self.get_serializer(self.get_dashboard(volunteer)).data
+        if ttl:
+            cache.set(key, (host, data), ttl)
+        return Response(data, 200)
+
+    def get_dashboard(self, volunteer: Volunteer) -> dict:
+        # A window over the row's own pk moves the pk filter after ranking, a plain filter would rank one row
+        standing = Volunteer.objects.filter(link__unit_id=volunteer.link.unit_id).with_rank().annotate(
+            own_pk=Window(Max("pk"), partition_by=F("pk"))
+        ).filter(own_pk=volunteer.pk).values("total_score", "rank", "unit_size").first()
+
+        signed_up = Rating.objects.filter(volunteer=volunteer).values("task_id")
+        tasks = Task.objects.for_listing().filter(pk__in=signed_up).first_of_each_state(settings.DASHBOARD_TASK_LIMIT)
+        upcoming, completed = [], []
+        for task in tasks:
+            (upcoming if task.is_open else completed).append(task)
+
+        return {
+            "profile": volunteer,
+            "score": standing["total_score"],
+            "rank": standing["rank"],
+            "unit_size": standing["unit_size"],
+            "upcoming": upcoming,
+            "completed": completed,
+        }
+
+
+class TaskApi(ConditionalListMixin, generics.ListAPIView):
 
     serializer_class = TaskSerializer
+    throttle_scope = "task"
 
-    def get_queryset(self):
+    def filter_tasks(self, queryset):
         if not self.request.user.is_authenticated:
-            return Task.objects.filter(is_open=False)
+            return queryset.filter(is_open=False)
         params = self.request.query_params
 
-        queryset = Task.objects.filter(is_open=params.get("is_open", True))
+        queryset = queryset.filter(is_open=params.get("is_open", True))
         return queryset
 
+    def get_queryset(self):
+        return self.filter_tasks(Task.objects.for_listing())
+
+    def get_list_state(self):
+        return self.filter_tasks(Task.objects.all()).aggregate(
+            count=Count("pk", distinct=True),
+            last_modified=Max("updated_at"),
+            comment_count=Count("comments"),
+            last_comment=Max("comments__pk"),
+        )
+
 
 class MyTaskApi(TaskApi):
 
     permission_classes = (IsAuthenticated,)
 
+    def filter_tasks(self, queryset):
+        return queryset.filter(ratings__volunteer__user=self.request.user)
+
+
+class UnitTaskApi(TaskApi):
+
+    permission_classes = (UnitMemberPermission,)
+
+    def filter_tasks(self, queryset):
+        return super().filter_tasks(queryset).filter(unit_id=self.kwargs["unit_id"])
+
+
+class UnitCommentApi(generics.ListAPIView):
+
+    permission_classes = (UnitMemberPermission,)
+    serializer_class = CommentReadSerializer
+
+    def get_queryset(self):
+        return Comment.objects.for_listing().filter(
+            task__unit_id=self.kwargs["unit_id"], task__deleted_at__isnull=True
+        ).order_by("-pk")
+
+
+class UnitAnalyticsApi(generics.ListAPIView):
+    """Weekly activity of a unit, read from the UnitDailyStats rollup only"""
+
+    permission_classes = (UnitMemberPermission,)
+    serializer_class = UnitWeeklyStatsSerializer
+
     def get_queryset(self):
-        return Task.objects.filter(ratings__volunteer__user=self.request.user)
+        try:
+            weeks = max(1, min(int(self.request.query_params.get("weeks", 12)), 104))
+        except ValueError:
+            weeks = 12
+        since = timezone.now().date() - timedelta(weeks=weeks)
+        return UnitDailyStats.objects.filter(unit_id=self.kwargs["unit_id"], date__gte=since).annotate(
+            week=TruncWeek("date")
+        ).values("week").annotate(
+            tasks_completed=Sum("tasks_completed"),
+            total_score=Sum("total_score"),
+            comments=Sum("comments"),
+        ).order_by("week")
 
 
 def proceed_task(view):
@@ -125,3 +268,127 @@ class CommentApi(generics.CreateAPIView):
             serializer.save(task=task, volunteer=request.user.volunteer)
             return Response(serializer.data, status=200)
         return Response(serializer.errors, status=400)
+
+
+class ExportApiView(APIView):
+    """
+    CSV exports of one unit, `?unit=<id>`, for its creator. Superusers may
+    export any unit or leave the parameter out to export all of them.
+    """
+
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (CSVRenderer, FastJSONRenderer)
+
+    def filter_unit(self, queryset, lookup: str):
+        user, unit_id = self.request.user, self.request.query_params.get("unit")
+        if not unit_id or not unit_id.isdigit():
+            if user.is_superuser:
+                return queryset
+            raise ValidationError({"unit": "This parameter is required"})
+        unit = Unit.objects.filter(id=unit_id).first()
+        if not unit:
+            raise NotFound("Unit not found")
+        if unit.creator != user and not user.is_superuser:
+            raise PermissionDenied("You don't have permission to export this group")
+        return queryset.filter(**{lookup: unit.pk})
+
+
+class LeaderboardExportApi(ExportApiView):
+
+    def get(self, request, *args, **kwargs):
+        volunteers = Volunteer.objects.active().with_score()
+        queryset = self.filter_unit(volunteers, "link__unit_id").order_by("-total_score", "pk")
+        rows = queryset.values_list(
+            "user__username", "user__first_name", "user__last_name", "link__unit__title", "total_score"
+        ).iterator(EXPORT_CHUNK_SIZE)
+        header = ("username", "first_name", "last_name", "unit", "score")
+        return stream_csv("leaderboard.csv", header, rows)
+
+
+class TaskParticipantsExportApi(ExportApiView):
+
+    def get(self, request, task_id: int, *args, **kwargs):
+        ratings = Rating.objects.filter(
+            task_id=task_id, task__deleted_at__isnull=True, volunteer__link__unit__deleted_at__isnull=True
+        )
+        queryset = self.filter_unit(ratings, "volunteer__link__unit_id")
+        rows = queryset.order_by("pk").values_list(
+            "volunteer__user__username", "volunteer__user__first_name", "volunteer__user__last_name",
+            "volunteer__link__unit__title", "created_at"
+        ).iterator(EXPORT_CHUNK_SIZE)
+        header = ("username", "first_name", "last_name", "unit", "signed_up_at")
+        return stream_csv(f"task-{task_id}-participants.csv", header, rows)
+
+
+class CommentExportApi(ExportApiView):
+
+    def get(self, request, *args, **kwargs):
+        comments = Comment.objects.filter(task__deleted_at__isnull=True, volunteer__link__unit__deleted_at__isnull=True)
+        queryset = self.filter_unit(comments, "volunteer__link__unit_id")
+        task_id = request.query_params.get("task")
+        if task_id and task_id.isdigit():
+            queryset = queryset.filter(task_id=task_id)
+        rows = queryset.order_by("pk").values_list(
+            "task_id", "task__title", "volunteer__user__username", "text", "photo", "created_at"
+        ).iterator(EXPORT_CHUNK_SIZE)
+        header = ("task_id", "task", "username", "text", "photo", "created_at")
+        return stream_csv("comments.csv", header, rows)
+
+
+@lru_cache(maxsize=None)
+def get_batch_views() -> frozenset:
+    # api.urls imports this module, the routes are read once they are loaded
+    from api.urls import api_routes
+
+    return frozenset(route.callback for route in api_routes)
+
+
+class BatchApi(APIView):
+    """
+    Runs several GET requests to the api routes in-process and answers with
+    their results in order, e.g. {"requests": ["/api/my/", "/api/task/?is_open=False"]}.
+    The caller is authenticated once, the sub-requests reuse its user and token.
+    Conditional headers aren't passed on, each result carries its own ETag instead.
+    """
+
+    def post(self, request, *args, **kwargs):
+        serializer = BatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        return Response([self.dispatch_get(request, url) for url in serializer.validated_data["requests"]], 200)
+
+    def dispatch_get(self, request, url: str) -> dict:
+        path, query = urlsplit(url)[2:4]
+        try:
+            match = resolve(path)
+        except Resolver404:
+            match = None
+        if match is None or match.func not in get_batch_views():
+            return {"url": url, "status": 404, "body": {"detail": "Not found."}}
+
+        response = match.func(self.make_subrequest(request, path, query, match), *match.args, **match.kwargs)
+        if not hasattr(response, "data"):
+            # Streamed exports and other non-api responses can't be embedded
+            return {"url": url, "status": 400, "body": {"detail": "Not available in a batch."}}
+        result = {"url": url, "status": response.status_code, "body": response.data}
+        if response.has_header("ETag"):
+            result["etag"] = response["ETag"]
+        return result
+
+    @staticmethod
+    def make_subrequest(request, path: str, query: str, match):
+        subrequest = copy.copy(request._request)
+        subrequest.method = "GET"
+        subrequest.path = subrequest.path_info = path
+        subrequest.GET = QueryDict(query)
+        subrequest.META = {
+            key: value for key, value in request.META.items()
+            if not key.startswith("HTTP_IF_") and key not in ("CONTENT_TYPE", "CONTENT_LENGTH")
+        }
+        subrequest.META.update(REQUEST_METHOD="GET", PATH_INFO=path, QUERY_STRING=query)
+        subrequest.resolver_match = match
+        if request.user.is_authenticated:
+            # Read by rest_framework.request.Request, the sub-view skips its authenticators
+            subrequest._force_auth_user = request.user
+            subrequest._force_auth_token = request.auth
+        return subrequest
@@ -1,5 +1,5 @@
 from django.apps import AppConfig
-from django.db.models.signals import pre_delete, pre_save
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 
 
 class ApiConfig(AppConfig):
@@ -8,8 +8,22 @@ class ApiConfig(AppConfig):
 
     def ready(self):
         from api import signals
-        from api.models import Comment, Volunteer
+        from api.models import Comment, Volunteer, VUser, Rating, Task
 
         for model in [Comment, Volunteer]:
-            pre_delete.connect(signals.delete_media, sender=model)
+            post_delete.connect(signals.delete_media, sender=model)
             pre_save.connect(signals.update_media, sender=model)
+            post_save.connect(signals.release_replaced_media, sender=model)
+
+        for model in [VUser, Volunteer]:
+            post_save.connect(signals.invalidate_user_cache, sender=model)
+            post_delete.connect(signals.invalidate_user_cache, sender=model)
+
+        for model in [Rating, Volunteer]:
+            post_save.connect(signals.invalidate_dashboard, sender=model)
+            post_delete.connect(signals.invalidate_dashboard, sender=model)
+        for model in [Rating, Comment]:
+            pre_delete.connect(signals.mark_deleted_activity, sender=model)
+        pre_save.connect(signals.mark_task_rollup_days, sender=Task)
+        post_save.connect(signals.invalidate_task_dashboards, sender=Task)
+        post_save.connect(signals.touch_user_rows, sender=VUser)
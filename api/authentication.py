@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from api.models import VUser
+
+
+def user_cache_key(user_id) -> str:
+    return f"auth:vuser:{user_id}"
+
+
+class VolunteerJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication which loads the user together with its volunteer, link
+    and unit in one query, so permission checks and views reading
+    `request.user.volunteer` don't hit the database again. With
+    AUTH_USER_CACHE_TTL set the loaded user is also kept in the cache,
+    api.signals drops it when the user or the volunteer changes.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        ttl = settings.AUTH_USER_CACHE_TTL
+        user = cache.get(user_cache_key(user_id)) if ttl else None
+        if user is None:
+            user = VUser.objects.select_related("volunteer__link__unit").filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).first()
+            if user is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if ttl:
+                cache.set(user_cache_key(user_id), user, ttl)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
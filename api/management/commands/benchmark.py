@@ -0,0 +1,154 @@
+import json
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.serializers import Serializer
+
+from api.models import VUser, Unit, Link, Task, Volunteer, Rating, Comment
+from api.renderers import FastJSONRenderer
+from api.throttling import TokenBucketThrottle, LocalBuckets, CacheBuckets
+from api.serializers import CachedFieldsMixin, TaskSerializer, VolunteerSerializer, CommentReadSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def legacy_representation():
+    fast = CachedFieldsMixin.to_representation
+    CachedFieldsMixin.to_representation = Serializer.to_representation
+    try:
+        yield
+    finally:
+        CachedFieldsMixin.to_representation = fast
+
+
+def seed(size: int):
+    now = timezone.now()
+    creator = VUser.objects.create(username="benchmark-creator")
+    unit = Unit.objects.create(creator=creator, title="Benchmark", description="Seeded by benchmark")
+    users = VUser.objects.bulk_create(
+        VUser(username=f"benchmark-{i}", first_name="Bench", last_name=str(i), email=f"bench{i}@example.com")
+        for i in range(size)
+    )
+    links = Link.objects.bulk_create(Link(unit=unit) for _ in range(size))
+    volunteers = Volunteer.objects.bulk_create(
+        Volunteer(user=user, link=link) for user, link in zip(users, links)
+    )
+    tasks = Task.objects.bulk_create(
+        Task(
+            title=f"Task {i}", description="Seeded by benchmark", creator=creator, score=i % 10,
+            date_start=now, date_end=now + timedelta(days=1), is_open=False
+        )
+        for i in range(size)
+    )
+    Rating.objects.bulk_create(Rating(task=task, volunteer=vol) for task, vol in zip(tasks, volunteers))
+    Comment.objects.bulk_create(
+        Comment(task=task, volunteer=vol, text="Seeded comment", photo=f"comment/{task.pk}.png" if i % 3 else None)
+        for i, (task, vol) in enumerate(zip(tasks, volunteers))
+    )
+
+
+class Command(BaseCommand):
+    help = "Times hot code paths against seeded data, everything is rolled back afterwards"
+
+    def add_arguments(self, parser):
+        parser.add_argument("target", choices=["serializers", "renderers", "throttle"])
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000])
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        bench = getattr(self, f"bench_{options['target']}")
+        for size in options["sizes"]:
+            if options["target"] == "throttle":
+                bench(size, options["repeat"])
+                continue
+            try:
+                with transaction.atomic():
+                    seed(size)
+                    bench(size, options["repeat"])
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def timeit(self, func, repeat: int):
+        best, result = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def report(self, size: int, name: str, legacy: float, fast: float, same: bool):
+        self.stdout.write(
+            f"{size:>7} {name:<12} legacy {legacy * 1000:9.1f} ms  fast {fast * 1000:9.1f} ms  "
+            f"x{legacy / fast:5.1f}  identical={same}"
+        )
+
+    def bench_serializers(self, size: int, repeat: int):
+        request = Request(RequestFactory().get("/", SERVER_NAME="localhost"))
+        context = {"request": request}
+        cases = {
+            "task": (
+                lambda: TaskSerializer(Task.objects.all(), many=True, context=context).data,
+                lambda: TaskSerializer(Task.objects.for_listing(), many=True, context=context).data,
+            ),
+            "volunteer": (
+                lambda: VolunteerSerializer(
+                    sorted(Volunteer.objects.all(), key=lambda v: v.score or 0), many=True, context=context
+                ).data,
+                lambda: VolunteerSerializer(
+                    Volunteer.objects.select_related("user").with_score().order_by("total_score", "pk"),
+                    many=True, context=context
+                ).data,
+            ),
+            "comment": (
+                lambda: CommentReadSerializer(Comment.objects.all(), many=True, context=context).data,
+                lambda: CommentReadSerializer(Comment.objects.for_listing(), many=True, context=context).data,
+            ),
+        }
+        for name, (legacy, fast) in cases.items():
+            with legacy_representation():
+                legacy_time, legacy_data = self.timeit(legacy, repeat)
+            fast_time, fast_data = self.timeit(fast, repeat)
+            same = json.dumps(legacy_data) == json.dumps(fast_data)
+            self.report(size, name, legacy_time, fast_time, same)
+
+    def bench_renderers(self, size: int, repeat: int):
+        request = Request(RequestFactory().get("/", SERVER_NAME="localhost"))
+        context = {"request": request}
+        payloads = {
+            "task": TaskSerializer(Task.objects.for_listing(), many=True, context=context).data,
+            "volunteer": VolunteerSerializer(
+                Volunteer.objects.select_related("user").with_score(), many=True, context=context
+            ).data,
+            "comment": CommentReadSerializer(Comment.objects.for_listing(), many=True, context=context).data,
+        }
+        for name, data in payloads.items():
+            legacy_time, legacy_body = self.timeit(lambda: JSONRenderer().render(data), repeat)
+            fast_time, fast_body = self.timeit(lambda: FastJSONRenderer().render(data), repeat)
+            self.report(size, name, legacy_time, fast_time, legacy_body == fast_body)
+
+    def bench_throttle(self, size: int, repeat: int):
+        """`size` is the number of requests, spread over 100 clients so most of them pass"""
+        request = Request(RequestFactory().get("/", SERVER_NAME="localhost"))
+        request.user  # authenticate once, the throttle only reads it
+        for name, buckets in (("local", LocalBuckets()), ("locmem cache", CacheBuckets("default"))):
+            throttle = TokenBucketThrottle(buckets)
+
+            def run():
+                for i in range(size):
+                    request.META["REMOTE_ADDR"] = f"10.0.0.{i % 100}"
+                    throttle.allow_request(request, self)
+
+            elapsed, _ = self.timeit(run, repeat)
+            self.stdout.write(f"{size:>7} {name:<12} {elapsed / size * 1e6:6.2f} us per request")
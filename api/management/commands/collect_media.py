@@ -0,0 +1,53 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.signals import referenced_files
+from api.storage import is_content_addressed
+
+
+class Command(BaseCommand):
+    help = "Removes content-addressed media nothing refers to once it was left untouched for the grace period"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-minutes", type=int, default=60,
+            help="Files touched more recently may belong to an upload whose row isn't committed yet"
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.root = str(settings.MEDIA_ROOT)
+        self.cutoff = time.time() - options["grace_minutes"] * 60
+        removed, batch = 0, []
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if is_content_addressed(name) and os.stat(path).st_mtime < self.cutoff:
+                    batch.append(name)
+                if len(batch) >= options["batch_size"]:
+                    removed += self.collect(batch)
+                    batch = []
+        removed += self.collect(batch)
+        self.stdout.write(f"{removed} files removed")
+
+    def collect(self, names) -> int:
+        removed = 0
+        for name in set(names) - referenced_files(names):
+            path = os.path.join(self.root, name)
+            moved = path + ".collecting"
+            # After the rename an upload of the same content can't touch the file and writes it again,
+            # one that touched it before the rename shows in the mtime and gets the file back
+            try:
+                os.rename(path, moved)
+            except FileNotFoundError:
+                continue
+            if os.stat(moved).st_mtime >= self.cutoff:
+                os.rename(moved, path)
+            else:
+                os.remove(moved)
+                removed += 1
+        return removed
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework.request import Request
+
+from api.schema import get_info, spec_path
+
+
+class Command(BaseCommand):
+    help = "Renders the OpenAPI schema to static JSON and YAML files served by /api/swagger.<format>/"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", default=None,
+            help="Public url of the site, e.g. https://volunteer.example.com, sets host and scheme of the spec"
+        )
+
+    def handle(self, *args, **options):
+        generator = OpenAPISchemaGenerator(info=get_info(), url=options["url"])
+        # Views read self.request while being introspected, same as for a live /api/swagger.json/ request
+        request = Request(RequestFactory().get("/api/swagger.json/", SERVER_NAME="localhost"))
+        schema = generator.get_schema(request=request, public=True)
+
+        settings.OPENAPI_SCHEMA_DIR.mkdir(parents=True, exist_ok=True)
+        for format, codec in ((".json", OpenAPICodecJson), (".yaml", OpenAPICodecYaml)):
+            path = spec_path(format)
+            path.write_bytes(codec(validators=[]).encode(schema))
+            self.stdout.write(f"Wrote {path}")
@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.partitions import (
+    MONTHS_AHEAD, PARTITIONED_TABLES, add_months, attached_months, create_partition, detach_partition,
+    is_partitioned, month_start, partition_name, partition_table
+)
+
+
+class Command(BaseCommand):
+    help = "Creates monthly partitions of ratings and comments ahead of time and detaches old ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=MONTHS_AHEAD, help="Months to create past the current one")
+        parser.add_argument(
+            "--detach-older-than", type=int, default=None,
+            help="Detach partitions which ended more than this many months ago, they are kept as plain tables"
+        )
+        parser.add_argument("--convert", action="store_true", help="Partition tables which are still plain")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning needs PostgreSQL")
+
+        current = month_start(datetime.now(timezone.utc))
+        for table, unique in PARTITIONED_TABLES.items():
+            with transaction.atomic(), connection.cursor() as cursor:
+                if not is_partitioned(cursor, table):
+                    if not options["convert"]:
+                        self.stdout.write(f"{table}: not partitioned, run with --convert")
+                        continue
+                    partition_table(connection, table, unique, options["ahead"])
+                    self.stdout.write(f"{table}: partitioned")
+
+                for offset in range(options["ahead"] + 1):
+                    month = add_months(current, offset)
+                    if create_partition(cursor, table, month):
+                        self.stdout.write(f"{table}: created {partition_name(table, month)}")
+
+                if options["detach_older_than"] is not None:
+                    cutoff = add_months(current, -options["detach_older_than"])
+                    for month in attached_months(cursor, table):
+                        if add_months(month, 1) <= cutoff:
+                            self.stdout.write(f"{table}: detached {detach_partition(cursor, table, month)}")
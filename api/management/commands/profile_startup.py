@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+# What a worker does before serving its first request
+STARTUP = "import django; django.setup(); from django.urls import get_resolver; get_resolver().url_patterns"
+
+
+class Command(BaseCommand):
+    help = "Boots Django in a fresh interpreter under -X importtime and reports the slowest imports"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=25)
+        parser.add_argument("--sort", choices=["self", "cumulative"], default="cumulative")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings")}
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP],
+            env=env, capture_output=True, text=True
+        )
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            raise CommandError(result.stderr.splitlines()[-1] if result.stderr else "Startup failed")
+
+        imports = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            own, cumulative, module = line[len("import time:"):].split("|")
+            imports.append((int(own), int(cumulative), module.strip()))
+
+        column = 0 if options["sort"] == "self" else 1
+        imports.sort(key=lambda item: item[column], reverse=True)
+        self.stdout.write(f"Startup took {elapsed * 1000:.0f} ms, {len(imports)} modules imported")
+        self.stdout.write(f"{'self ms':>9} {'cumul ms':>9}  module")
+        for own, cumulative, module in imports[:options["top"]]:
+            self.stdout.write(f"{own / 1000:9.1f} {cumulative / 1000:9.1f}  {module}")
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.authentication import user_cache_key
+from api.models import Unit, Task, Link, Volunteer, Rating, Comment, dashboard_cache_key, mark_rollup_days
+from api.signals import release_files
+
+
+class Command(BaseCommand):
+    help = "Hard-deletes soft-deleted units and tasks with everything under them, in bounded batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=7, help="Days a deleted row is kept for")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        cutoff = timezone.now() - timedelta(days=options["older_than"])
+
+        tasks = Task.all_objects.filter(deleted_at__lte=cutoff)
+        self.purge_comments(Comment.objects.filter(task__in=tasks))
+        self.purge_ratings(Rating.objects.filter(task__in=tasks))
+        self.purge(tasks)
+
+        units = Unit.all_objects.filter(deleted_at__lte=cutoff)
+        volunteers = Volunteer.objects.filter(link__unit__in=units)
+        self.purge_comments(Comment.objects.filter(volunteer__in=volunteers))
+        self.purge_ratings(Rating.objects.filter(volunteer__in=volunteers))
+        self.purge_volunteers(volunteers)
+        self.purge(Link.objects.filter(unit__in=units))
+        self.purge(units)
+
+    def batches(self, queryset, *fields):
+        """Yields pk lists (or value tuples) of at most batch_size rows until the queryset is empty"""
+        while True:
+            rows = queryset.order_by("pk").values_list("pk", *fields, flat=not fields)
+            batch = list(rows[:self.batch_size])
+            if not batch:
+                return
+            yield batch
+
+    def purge(self, queryset):
+        model, total = queryset.model, 0
+        for batch in self.batches(queryset):
+            with transaction.atomic():
+                # Everything referencing these rows is gone already, the cascade finds nothing to collect
+                total += model._base_manager.filter(pk__in=batch).delete()[0]
+        self.stdout.write(f"{model._meta.label}: {total} deleted")
+
+    def purge_comments(self, queryset):
+        total = 0
+        for batch in self.batches(queryset, "photo"):
+            with transaction.atomic():
+                # _raw_delete skips the per-row delete signals, the rollup days and files are handled per batch
+                mark_rollup_days(Comment.objects.filter(pk__in=[pk for pk, _ in batch]))
+                Comment.objects.filter(pk__in=[pk for pk, _ in batch])._raw_delete(Comment.objects.db)
+                transaction.on_commit(lambda paths=[photo for _, photo in batch]: release_files(paths))
+            total += len(batch)
+        self.stdout.write(f"api.Comment: {total} deleted")
+
+    def purge_ratings(self, queryset):
+        total = 0
+        for batch in self.batches(queryset, "volunteer_id"):
+            with transaction.atomic():
+                ratings = Rating.objects.filter(pk__in=[pk for pk, _ in batch])
+                mark_rollup_days(ratings)
+                ratings._raw_delete(Rating.objects.db)
+            cache.delete_many({dashboard_cache_key(volunteer_id) for _, volunteer_id in batch})
+            total += len(batch)
+        self.stdout.write(f"api.Rating: {total} deleted")
+
+    def purge_volunteers(self, queryset):
+        total = 0
+        for batch in self.batches(queryset, "avatar", "user_id"):
+            with transaction.atomic():
+                Volunteer.objects.filter(pk__in=[pk for pk, _, _ in batch])._raw_delete(Volunteer.objects.db)
+                transaction.on_commit(lambda paths=[avatar for _, avatar, _ in batch]: release_files(paths))
+            cache.delete_many([user_cache_key(user_id) for _, _, user_id in batch])
+            total += len(batch)
+        self.stdout.write(f"api.Volunteer: {total} deleted")
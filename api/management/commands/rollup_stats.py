@@ -0,0 +1,89 @@
+import operator
+from datetime import timedelta
+from functools import reduce
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from api.models import Rating, Comment, UnitDailyStats, RollupWatermark, RollupDirtyDay
+
+WATERMARK = "unit_daily_stats"
+UNIT = "volunteer__link__unit_id"
+
+
+def affected_days(since) -> set:
+    """(unit_id, date) pairs whose rollup may have changed since the watermark, deletions come from RollupDirtyDay"""
+    ratings = Rating.objects.filter(task__is_open=False)
+    comments = Comment.objects.all()
+    if since is not None:
+        # New sign-ups on closed tasks, and every participant of a task closed/edited since
+        ratings = ratings.filter(created_at__gte=since) | Rating.objects.filter(task__updated_at__gte=since)
+        comments = comments.filter(created_at__gte=since)
+    keys = set(ratings.annotate(day=TruncDate("task__date_end")).values_list(UNIT, "day").distinct())
+    keys |= set(comments.annotate(day=TruncDate("created_at")).values_list(UNIT, "day").distinct())
+    keys |= set(RollupDirtyDay.objects.values_list("unit_id", "date"))
+    return keys
+
+
+def recompute(keys: list) -> list:
+    """Rebuilds rollup rows for the given pairs from the raw tables"""
+    units, days = {unit for unit, _ in keys}, {day for _, day in keys}
+    rows = {key: UnitDailyStats(unit_id=key[0], date=key[1]) for key in keys}
+
+    completed = Rating.objects.filter(
+        task__is_open=False, task__deleted_at__isnull=True, volunteer__link__unit_id__in=units, task__date_end__date__in=days
+    ).annotate(day=TruncDate("task__date_end")).values(UNIT, "day").annotate(
+        count=Count("pk"), score=Sum("task__score")
+    )
+    for item in completed:
+        if (row := rows.get((item[UNIT], item["day"]))) is not None:
+            row.tasks_completed, row.total_score = item["count"], item["score"] or 0
+
+    comments = Comment.objects.filter(
+        task__deleted_at__isnull=True, volunteer__link__unit_id__in=units, created_at__date__in=days
+    ).annotate(day=TruncDate("created_at")).values(UNIT, "day").annotate(count=Count("pk"))
+    for item in comments:
+        if (row := rows.get((item[UNIT], item["day"]))) is not None:
+            row.comments = item["count"]
+
+    return list(rows.values())
+
+
+class Command(BaseCommand):
+    help = "Incrementally refreshes UnitDailyStats from ratings and comments added or deleted since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Ignore the watermark and rebuild every day")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--overlap", type=int, default=5,
+            help="Minutes re-read before the watermark, covers transactions that committed late"
+        )
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK)
+        since = None if options["full"] else watermark.value
+
+        keys = sorted(key for key in affected_days(since) if key[0] is not None)
+        batch_size = options["batch_size"]
+        for i in range(0, len(keys), batch_size):
+            batch = keys[i:i + batch_size]
+            with transaction.atomic():
+                # Cleared before the recount, a deletion committed after it marks the day again
+                RollupDirtyDay.objects.filter(
+                    reduce(operator.or_, (Q(unit_id=unit_id, date=date) for unit_id, date in batch))
+                ).delete()
+                UnitDailyStats.objects.bulk_create(
+                    recompute(batch),
+                    update_conflicts=True,
+                    unique_fields=["unit", "date"],
+                    update_fields=["tasks_completed", "total_score", "comments"],
+                )
+
+        watermark.value = started - timedelta(minutes=options["overlap"])
+        watermark.save()
+        self.stdout.write(f"Refreshed {len(keys)} unit days")
@@ -0,0 +1,126 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import VolunteerJWTAuthentication
+from api.storage import is_content_addressed
+
+re_range = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def is_authenticated(request) -> bool:
+    """Admin session or the API's bearer token"""
+    if request.user.is_authenticated:
+        return True
+    try:
+        return VolunteerJWTAuthentication().authenticate(request) is not None
+    except AuthenticationFailed:
+        return False
+
+
+def parse_range(header: str, size: int):
+    """
+    Single `bytes=` range -> inclusive (first, last), None when the whole file
+    should be sent (no, malformed or multiple ranges) and () when it can't be satisfied
+    """
+    match = re_range.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        return (max(size - suffix, 0), size - 1) if suffix and size else ()
+    first, last = int(first), int(last) if last else size - 1
+    if first >= size:
+        return ()
+    if first > last:
+        return None
+    return first, min(last, size - 1)
+
+
+def read_range(path, first: int, last: int):
+    with open(path, "rb") as file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+def send_file(request, path: str, full_path: str, size: int, etag: str):
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    # The proxy reads the file and answers range requests itself
+    if settings.MEDIA_ACCEL == "x-accel-redirect":
+        response = HttpResponse(content_type=content_type)
+        response.headers["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+        return response
+    if settings.MEDIA_ACCEL == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response.headers["X-Sendfile"] = full_path
+        return response
+
+    byte_range = None
+    if "Range" in request.headers and request.headers.get("If-Range", etag) == etag:
+        byte_range = parse_range(request.headers["Range"], size)
+    if byte_range == ():
+        response = HttpResponse(status=416)
+        response.headers["Content-Range"] = f"bytes */{size}"
+    elif byte_range:
+        first, last = byte_range
+        response = StreamingHttpResponse(read_range(full_path, first, last), status=206, content_type=content_type)
+        response.headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+        response.headers["Content-Length"] = str(last - first + 1)
+    else:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serves MEDIA_ROOT. With MEDIA_ACCEL set the transfer is handed to the front
+    proxy, Django only checks access and sets the caching headers.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Media not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Media not found")
+
+    private = path.startswith(tuple(settings.MEDIA_PRIVATE_PREFIXES))
+    if private and not is_authenticated(request):
+        raise PermissionDenied
+
+    stat = os.stat(full_path)
+    mtime = int(stat.st_mtime)
+    etag = f'"{mtime:x}-{stat.st_size:x}"'
+    response = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if response is None:
+        response = send_file(request, path, full_path, stat.st_size, etag)
+
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(mtime)
+    visibility = {"private": True} if private else {"public": True}
+    if is_content_addressed(path):
+        patch_cache_control(response, max_age=IMMUTABLE_MAX_AGE, immutable=True, **visibility)
+    else:
+        patch_cache_control(response, max_age=settings.MEDIA_CACHE_MAX_AGE, **visibility)
+    return response
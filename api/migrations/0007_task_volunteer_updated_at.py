@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-19 15:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_remove_volunteer_unit_link_unit'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'verbose_name': 'Комментарий', 'verbose_name_plural': 'Комментарии'},
+        ),
+        migrations.AlterModelOptions(
+            name='link',
+            options={'verbose_name': 'Ссылка', 'verbose_name_plural': 'Ссылки'},
+        ),
+        migrations.AlterModelOptions(
+            name='rating',
+            options={'verbose_name': 'Рейтинг', 'verbose_name_plural': 'Рейтинги'},
+        ),
+        migrations.AlterModelOptions(
+            name='task',
+            options={'verbose_name': 'Задача', 'verbose_name_plural': 'Задачи'},
+        ),
+        migrations.AlterModelOptions(
+            name='unit',
+            options={'verbose_name': 'Группа', 'verbose_name_plural': 'Группы'},
+        ),
+        migrations.AlterModelOptions(
+            name='volunteer',
+            options={'verbose_name': 'Волонтер', 'verbose_name_plural': 'Волонтеры'},
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='volunteer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
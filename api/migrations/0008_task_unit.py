@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-19 15:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_task_volunteer_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='unit',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='api.unit'),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['unit', 'id'], name='link_unit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['unit', 'is_open', 'date_start'], name='task_unit_open_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Admin searches with the "^" prefix compile to UPPER(column::text) LIKE UPPER('term%'),
+# these expression indexes make that an index range scan on Postgres.
+SEARCH_INDEXES = (
+    ("vuser_username_upper_like", "api_vuser", "username"),
+    ("task_title_upper_like", "api_task", "title"),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" (UPPER(("{column}")::text) text_pattern_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_task_unit'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
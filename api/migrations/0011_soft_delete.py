@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_unit_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-19 15:49
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='photo',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=api.storage.HashedFileSystemStorage(), upload_to='images'),
+        ),
+        migrations.AlterField(
+            model_name='volunteer',
+            name='avatar',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=api.storage.HashedFileSystemStorage(), upload_to='images'),
+        ),
+    ]
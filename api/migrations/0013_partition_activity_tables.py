@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db import migrations
+
+from api.partitions import PARTITIONED_TABLES, partition_table
+
+
+def partition_tables(apps, schema_editor):
+    # Opt-in, `manage.py manage_partitions --convert` does the same once the setting is turned on later
+    if schema_editor.connection.vendor != "postgresql" or not settings.PARTITION_ACTIVITY_TABLES:
+        return
+    for table, unique in PARTITIONED_TABLES.items():
+        partition_table(schema_editor.connection, table, unique)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_content_addressed_media'),
+    ]
+
+    operations = [
+        # Not reversed, the models read and write partitioned tables the same way
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-19 16:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_comment_dates(apps, schema_editor):
+    # 0010 stamped every existing comment with the one migration time. The day of
+    # the task is the closest known date, so history doesn't pile up on that day.
+    Comment = apps.get_model('api', 'Comment')
+    Task = apps.get_model('api', 'Task')
+    stamp = Comment.objects.values('created_at').annotate(count=Count('pk')).order_by('-count').first()
+    if stamp is None or stamp['count'] < 2:
+        return
+    Comment.objects.filter(created_at=stamp['created_at']).update(
+        created_at=Subquery(Task.objects.filter(pk=OuterRef('task_id')).values('date_end')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_partition_activity_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.unit')),
+            ],
+            options={
+                'unique_together': {('unit', 'date')},
+            },
+        ),
+        # Run `manage.py rollup_stats --full` afterwards to move the comment counts
+        migrations.RunPython(backfill_comment_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response, quote_etag
+
+
+class ConditionalListMixin:
+    """
+    Answers GET with 304 before the queryset is serialized when the client
+    already holds the current listing.
+
+    Views implement `get_list_state`, a cheap aggregate returning a dict with
+    whatever changes together with the listing, e.g. the latest `updated_at`,
+    row count and max pk of a related table. Only an ETag is sent, a single
+    timestamp can't reflect deleted rows, so Last-Modified would go stale.
+    """
+
+    def get_list_state(self) -> dict:
+        raise NotImplementedError("`get_list_state()` must be implemented.")
+
+    def get(self, request, *args, **kwargs):
+        state = self.get_list_state()
+        # The body also depends on the user, the query string and the host (absolute media urls)
+        fingerprint = "|".join([
+            str(request.user.pk), request.get_full_path(), request.get_host(),
+            *(f"{key}={value}" for key, value in sorted(state.items()))
+        ])
+        etag = quote_etag(md5(fingerprint.encode(), usedforsecurity=False).hexdigest())
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response.headers["ETag"] = etag
+        return response
@@ -4,9 +4,13 @@ from uuid import uuid4
 
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.db.models import Sum
+from django.db.models import Sum, Q, OuterRef, Subquery, Prefetch, Window, F, Count, Case, When
+from django.db.models.functions import Coalesce, Rank, RowNumber, TruncDate
+from django.utils import timezone
 from django.utils.deconstruct import deconstructible
 
+from api.storage import hashed_storage
+
 
 @deconstructible
 class UploadToPathAndRename(object):
@@ -31,11 +35,64 @@ class VUser(AbstractUser):
         return str(self.username)
 
 
-class Unit(models.Model):
+def soft_delete_fields(model) -> dict:
+    """deleted_at, and updated_at where the model has one, listings' ETags follow it"""
+    now = timezone.now()
+    fields = {"deleted_at": now}
+    if any(field.name == "updated_at" for field in model._meta.concrete_fields):
+        fields["updated_at"] = now
+    return fields
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+
+    def delete(self):
+        """Only marks the rows, `manage.py purge_deleted` removes them with their dependents later"""
+        return self.update(**soft_delete_fields(self.model)), {}
+
+    def hard_delete(self):
+        return super().delete()
+
+
+class SoftDeleteManager(models.Manager):
+    """Default manager of soft-deletable models, hides deleted rows"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class SoftDeleteModel(models.Model):
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def delete(self, using=None, keep_parents=False):
+        fields = soft_delete_fields(type(self))
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.save(update_fields=list(fields))
+        return 1, {self._meta.label: 1}
+
+    def hard_delete(self, using=None, keep_parents=False):
+        return super().delete(using, keep_parents)
+
+
+class UnitQuerySet(SoftDeleteQuerySet):
+
+    def delete(self):
+        Task.all_objects.filter(unit__in=self, deleted_at__isnull=True).delete()
+        return super().delete()
+
+
+class Unit(SoftDeleteModel):
     creator = models.ForeignKey(VUser, on_delete=models.CASCADE, related_name='units')
     title = models.CharField(max_length=100)
     description = models.TextField()
 
+    objects = SoftDeleteManager.from_queryset(UnitQuerySet)()
+    all_objects = UnitQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Группа"
         verbose_name_plural = "Группы"
@@ -43,6 +100,10 @@ class Unit(models.Model):
     def __str__(self):
         return str(self.title)
 
+    def delete(self, using=None, keep_parents=False):
+        self.tasks.all().delete()
+        return super().delete(using, keep_parents)
+
 
 class Link(models.Model):
     code = models.UUIDField(unique=True, default=uuid4)
@@ -54,19 +115,55 @@ class Link(models.Model):
     class Meta:
         verbose_name = "Ссылка"
         verbose_name_plural = "Ссылки"
+        indexes = [
+            models.Index(fields=["unit", "id"], name="link_unit_idx"),
+        ]
 
     def is_open(self):
         return hasattr(self, 'volunteer')
 
 
-class Task(models.Model):
+class TaskQuerySet(SoftDeleteQuerySet):
+
+    def delete(self):
+        # An update sends no pre_save, see api.signals.mark_task_rollup_days
+        mark_rollup_days(Rating.objects.filter(task__in=self))
+        mark_rollup_days(Comment.objects.filter(task__in=self))
+        return super().delete()
+
+    def for_listing(self):
+        """Joins the creator and annotates the first comment photo for TaskSerializer"""
+        photos = Comment.objects.filter(task=OuterRef("pk"), photo__isnull=False).exclude(photo="")
+        return self.select_related("creator").annotate(
+            first_photo=Subquery(photos.order_by("pk").values("photo")[:1])
+        )
+
+    def first_of_each_state(self, limit: int):
+        """
+        At most `limit` open tasks, soonest first, and `limit` closed ones, latest
+        first, in one query. Plain filters apply before the numbering.
+        """
+        return self.annotate(position=Window(
+            RowNumber(),
+            partition_by=F("is_open"),
+            # Closed tasks have no start key, they are ordered by the end date alone
+            order_by=[Case(When(is_open=True, then=F("date_start"))).asc(), F("date_end").desc(), F("pk").asc()],
+        )).filter(position__lte=limit).order_by("position")
+
+
+class Task(SoftDeleteModel):
     title = models.CharField(max_length=100)
     description = models.TextField()
     creator = models.ForeignKey(VUser, on_delete=models.CASCADE, related_name='tasks')
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='tasks', null=True, blank=True)
     score = models.PositiveIntegerField(default=0)
     date_start = models.DateTimeField()
     date_end = models.DateTimeField()
     is_open = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = SoftDeleteManager.from_queryset(TaskQuerySet)()
+    all_objects = TaskQuerySet.as_manager()
 
     def __str__(self):
         return str(self.title)
@@ -74,16 +171,53 @@ class Task(models.Model):
     class Meta:
         verbose_name = "Задача"
         verbose_name_plural = "Задачи"
+        indexes = [
+            models.Index(fields=["unit", "is_open", "date_start"], name="task_unit_open_idx"),
+        ]
 
     @property
     def is_archived(self):
         return self.date_end + timedelta(days=2) > datetime.now()
 
 
+class VolunteerQuerySet(models.QuerySet):
+
+    def active(self):
+        """Volunteers whose unit isn't deleted"""
+        return self.filter(link__unit__deleted_at__isnull=True)
+
+    def with_score(self):
+        """Annotates `total_score`, the same sum `Volunteer.score` computes per row"""
+        return self.annotate(total_score=Coalesce(
+            Sum("ratings__task__score", filter=Q(
+                ratings__task__is_open=False, ratings__task__deleted_at__isnull=True
+            )), 0
+        ))
+
+    def with_rank(self):
+        """
+        Annotates `total_score`, `rank` within the volunteer's unit (equal scores
+        share a rank) and `unit_size`. Plain filters narrow the rows before they
+        are ranked, filters on window annotations run after it.
+        """
+        unit = F("link__unit_id")
+        return self.with_score().annotate(
+            rank=Window(Rank(), partition_by=unit, order_by=F("total_score").desc()),
+            unit_size=Window(Count("pk"), partition_by=unit),
+        )
+
+
+def dashboard_cache_key(volunteer_id) -> str:
+    return f"dashboard:volunteer:{volunteer_id}"
+
+
 class Volunteer(models.Model):
     user = models.OneToOneField(VUser, on_delete=models.CASCADE, related_name='volunteer')
     link = models.OneToOneField(Link, on_delete=models.CASCADE, related_name='volunteer')
-    avatar = models.ImageField(upload_to=UploadToPathAndRename("volunteer"), null=True, blank=True)
+    avatar = models.ImageField(upload_to="images", storage=hashed_storage, null=True, blank=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = VolunteerQuerySet.as_manager()
 
     def __str__(self):
         return f"Волонтер {self.user}"
@@ -94,7 +228,9 @@ class Volunteer(models.Model):
 
     @property
     def score(self):
-        return self.ratings.filter(task__is_open=False).aggregate(
+        if hasattr(self, "total_score"):
+            return self.total_score
+        return self.ratings.filter(task__is_open=False, task__deleted_at__isnull=True).aggregate(
             Sum("task__score")
         ).get("task__score__sum", 0)
 
@@ -102,6 +238,7 @@ class Volunteer(models.Model):
 class Rating(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='ratings')
     volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE, related_name='ratings')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"{self.volunteer} на {self.task}"
@@ -112,11 +249,23 @@ class Rating(models.Model):
         verbose_name_plural = "Рейтинги"
 
 
+class CommentQuerySet(models.QuerySet):
+
+    def for_listing(self):
+        """Loads everything CommentReadSerializer touches in three queries"""
+        return self.select_related("volunteer__user", "volunteer__link__unit").prefetch_related(
+            Prefetch("task", queryset=Task.objects.for_listing())
+        )
+
+
 class Comment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
     volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE, related_name='comments')
     text = models.TextField()
-    photo = models.ImageField(upload_to=UploadToPathAndRename("comment"), null=True, blank=True)
+    photo = models.ImageField(upload_to="images", storage=hashed_storage, null=True, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = CommentQuerySet.as_manager()
 
     def __str__(self):
         return f"От {self.volunteer}: {self.text[:20] + ('...' if len(self.text) > 20 else '')}"
@@ -124,3 +273,47 @@ class Comment(models.Model):
     class Meta:
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+
+
+class UnitDailyStats(models.Model):
+    """Per unit and day rollup of Rating and Comment, filled by `manage.py rollup_stats`"""
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    tasks_completed = models.PositiveIntegerField(default=0)
+    total_score = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.unit} {self.date}"
+
+    class Meta:
+        unique_together = ('unit', 'date')
+        verbose_name = "Статистика за день"
+        verbose_name_plural = "Статистика по дням"
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    value = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class RollupDirtyDay(models.Model):
+    """Unit day a deleted rating or comment was counted in, `rollup_stats` recomputes and clears it"""
+    unit = models.ForeignKey(Unit, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ('unit', 'date')
+
+
+def mark_rollup_days(queryset) -> None:
+    """Queues the unit days these ratings or comments are counted in for `rollup_stats`"""
+    day = "task__date_end" if queryset.model is Rating else "created_at"
+    keys = queryset.annotate(day=TruncDate(day)).values_list("volunteer__link__unit_id", "day").distinct()
+    RollupDirtyDay.objects.bulk_create(
+        [RollupDirtyDay(unit_id=unit_id, date=date) for unit_id, date in keys if unit_id is not None],
+        ignore_conflicts=True,
+    )
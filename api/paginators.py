@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator which takes the row count of an unfiltered queryset from the
+    Postgres planner statistics (pg_class.reltuples) instead of COUNT(*).
+    The estimate is used only above ESTIMATED_COUNT_THRESHOLD rows, smaller
+    tables, filtered querysets and other databases get the exact count.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = self.estimate(queryset)
+            if estimate is not None and estimate >= settings.ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def estimate(queryset: QuerySet):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
@@ -0,0 +1,166 @@
+"""
+Monthly range partitioning of the rating and comment tables by `created_at`,
+PostgreSQL 13 or newer. Partitions are named `<table>_pYYYYMM`, rows outside
+of them land in `<table>_default`. Enabled with PARTITION_ACTIVITY_TABLES,
+`manage.py manage_partitions` creates upcoming months and detaches old ones.
+"""
+import re
+from datetime import datetime, timezone
+
+PARTITION_KEY = "created_at"
+MONTHS_AHEAD = 3
+
+# Table -> unique column sets. A unique index on a partitioned table has to
+# contain the partition key, these are checked by a trigger instead.
+PARTITIONED_TABLES = {
+    "api_rating": (("task_id", "volunteer_id"),),
+    "api_comment": (),
+}
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def is_partitioned(cursor, table: str) -> bool:
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [table])
+    return cursor.fetchone()[0]
+
+
+def attached_months(cursor, table: str) -> list:
+    """Months of the attached `<table>_pYYYYMM` partitions, oldest first"""
+    cursor.execute(
+        "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(%s)", [table]
+    )
+    re_name = re.compile(rf"^{re.escape(table)}_p(\d{{4}})(\d{{2}})$")
+    months = []
+    for (name,) in cursor.fetchall():
+        if match := re_name.match(name):
+            months.append(datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc))
+    return sorted(months)
+
+
+def create_partition(cursor, table: str, month: datetime) -> bool:
+    """Creates the month's partition unless it exists, returns whether it was created"""
+    name = partition_name(table, month)
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    cursor.execute(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    # Rows of this month that went to the default partition move over, ATTACH refuses to overlap them
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM "{table}_default" WHERE "{PARTITION_KEY}" >= %s AND "{PARTITION_KEY}" < %s '
+        f'RETURNING *) INSERT INTO "{name}" SELECT * FROM moved', [start, end]
+    )
+    cursor.execute(f"ALTER TABLE \"{table}\" ATTACH PARTITION \"{name}\" FOR VALUES FROM ('{start}') TO ('{end}')")
+    return True
+
+
+def detach_partition(cursor, table: str, month: datetime) -> str:
+    """The detached partition stays as a plain table to be archived or dropped"""
+    name = partition_name(table, month)
+    cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+    return name
+
+
+def unique_trigger_sql(table: str, columns) -> list:
+    name = f"{table}_{'_'.join(columns)}_uniq"
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    condition = " AND ".join(f'"{column}" = NEW."{column}"' for column in columns)
+    key = " || ':' || ".join(f'NEW."{column}"' for column in columns)
+    return [
+        f'''CREATE FUNCTION "{name}"() RETURNS trigger AS $$
+        BEGIN
+            -- Writers of the same key wait for each other, so the check sees rows committed meanwhile
+            PERFORM pg_advisory_xact_lock(hashtextextended({key}, 0));
+            IF EXISTS (SELECT 1 FROM "{table}" WHERE {condition} AND "id" <> NEW."id") THEN
+                RAISE unique_violation USING MESSAGE = 'duplicate key value violates unique constraint "{name}"';
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql''',
+        f'CREATE TRIGGER "{name}" BEFORE INSERT OR UPDATE OF {column_list} ON "{table}" '
+        f'FOR EACH ROW EXECUTE FUNCTION "{name}"()',
+        f'CREATE INDEX "{name}_idx" ON "{table}" ({column_list})',
+    ]
+
+
+def partition_table(connection, table: str, unique=(), months_ahead: int = MONTHS_AHEAD) -> bool:
+    """
+    Rebuilds a plain table as a partitioned one with the same columns, indexes
+    and foreign keys and copies the rows over. The primary key becomes
+    (id, created_at). Meant to run inside a transaction, returns False when the
+    table is partitioned already.
+    """
+    partitioned = f"{table}_partitioned"
+    sequence = f"{table}_partitioned_id_seq"
+    with connection.cursor() as cursor:
+        if is_partitioned(cursor, table):
+            return False
+        # Deferred foreign key checks of earlier writes in this transaction would block DROP TABLE
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        # Unique constraints and the primary key are replaced, plain indexes and foreign keys are kept
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s "
+            "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s))",
+            [table, table]
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'", [table]
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT min("{PARTITION_KEY}"), max("id") FROM "{table}"')
+        oldest, last_id = cursor.fetchone()
+
+        cursor.execute(
+            f'CREATE TABLE "{partitioned}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ("{PARTITION_KEY}")'
+        )
+        # Identity columns aren't allowed on partitioned tables before PostgreSQL 17
+        cursor.execute(f'CREATE SEQUENCE "{sequence}"')
+        if last_id is not None:
+            cursor.execute("SELECT setval(%s, %s)", [sequence, last_id])
+        cursor.execute(f'ALTER TABLE "{partitioned}" ALTER COLUMN "id" SET DEFAULT nextval(\'"{sequence}"\')')
+        cursor.execute(f'ALTER TABLE "{partitioned}" ADD CONSTRAINT "{table}_partitioned_pkey" '
+                       f'PRIMARY KEY ("id", "{PARTITION_KEY}")')
+        cursor.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{partitioned}" DEFAULT')
+        current = month_start(datetime.now(timezone.utc))
+        month = month_start(oldest) if oldest else current
+        while month <= add_months(current, months_ahead):
+            name = partition_name(table, month)
+            cursor.execute(
+                f"CREATE TABLE \"{name}\" PARTITION OF \"{partitioned}\" "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            )
+            month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO "{partitioned}" SELECT * FROM "{table}"')
+        cursor.execute(f'DROP TABLE "{table}"')
+        cursor.execute(f'ALTER TABLE "{partitioned}" RENAME TO "{table}"')
+        cursor.execute(f'ALTER TABLE "{table}" RENAME CONSTRAINT "{table}_partitioned_pkey" TO "{table}_pkey"')
+        cursor.execute(f'ALTER SEQUENCE "{sequence}" RENAME TO "{table}_id_seq"')
+        cursor.execute(f'ALTER SEQUENCE "{table}_id_seq" OWNED BY "{table}"."id"')
+
+        for index in indexes:
+            cursor.execute(index)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+        for columns in unique:
+            for statement in unique_trigger_sql(table, columns):
+                cursor.execute(statement)
+    return True
@@ -1,6 +1,23 @@
+from django.db.models import Q
 from rest_framework.permissions import BasePermission
 
+from api.models import Unit
+
 
 class VolunteerPermission(BasePermission):
     def has_permission(self, request, view):
-        return hasattr(request.user, 'volunteer')
+        # The unit is loaded with the user by VolunteerJWTAuthentication, a cached user
+        # notices the unit's deletion once its AUTH_USER_CACHE_TTL runs out
+        return hasattr(request.user, 'volunteer') and request.user.volunteer.link.unit.deleted_at is None
+
+
+class UnitMemberPermission(BasePermission):
+    """Lets in the unit's creator and volunteers who joined it, the unit comes from the url"""
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user.is_authenticated:
+            return False
+        return Unit.objects.filter(
+            Q(creator=user) | Q(links__volunteer__user=user), id=view.kwargs["unit_id"]
+        ).exists()
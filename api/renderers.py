@@ -0,0 +1,70 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer which encodes through orjson when it is installed.
+    UUIDs and datetimes are handled natively (datetimes keep microseconds, DRF's
+    encoder cuts them to milliseconds), anything else goes through DRF's encoder.
+    """
+
+    default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+        elif indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=self.default, option=option)
+        # Same as JSONRenderer: keep the output a strict javascript subset
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser which decodes through orjson when it is installed"""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Lets export views pass content negotiation for `Accept: text/csv`. The CSV
+    itself is streamed by the views, only error details end up here.
+    """
+
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            return '\n'.join(f'{key},{value}' for key, value in data.items()).encode()
+        return str(data).encode()
@@ -0,0 +1,125 @@
+from functools import lru_cache
+from hashlib import sha256
+
+from django.conf import settings
+from django.http import HttpResponse, Http404
+from django.utils.cache import get_conditional_response, quote_etag
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+SPEC_CONTENT_TYPES = {
+    ".json": "application/json",
+    ".yaml": "application/yaml",
+}
+
+# Schema responses depend on the host they are served from (the spec embeds it),
+# anything else about the request doesn't matter since the schema is public.
+_schemas = {}
+_specs = {}
+
+
+def _request_key(request, *parts) -> tuple:
+    return (*parts, request.scheme, request.get_host())
+
+
+@lru_cache(maxsize=None)
+def get_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Volunteer Api",
+        default_version="v1",
+        description="API to work with data from Database",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="bogdanbelenesku@gmail.com"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_schema_view():
+    """Imports drf_yasg and builds the SchemaView on first use instead of at url loading"""
+    from drf_yasg import openapi
+    from drf_yasg.generators import OpenAPISchemaGenerator
+    from drf_yasg.views import get_schema_view as yasg_schema_view
+
+    schema_view = yasg_schema_view(
+        get_info(),
+        generator_class=OpenAPISchemaGenerator,
+        public=True,
+        permission_classes=[AllowAny],
+    )
+
+    class CachedSchemaView(schema_view):
+        """Introspects the serializers once, later requests reuse the generated schema"""
+
+        def get(self, request, version='', format=None):
+            if not settings.DEBUG:
+                # The UI page only needs title and version, it loads the spec from SPEC_URL
+                return Response(openapi.Swagger(info=get_info(), _prefix="/", paths=openapi.Paths(paths={})))
+            key = _request_key(request, version)
+            if key not in _schemas:
+                _schemas[key] = super().get(request, version, format).data
+            return Response(_schemas[key])
+
+    return CachedSchemaView
+
+
+@lru_cache(maxsize=None)
+def get_view(ui: bool):
+    schema_view = get_schema_view()
+    return schema_view.with_ui("swagger", cache_timeout=0) if ui else schema_view.without_ui(cache_timeout=0)
+
+
+def spec_path(format):
+    return settings.OPENAPI_SCHEMA_DIR / f"openapi{format}"
+
+
+@lru_cache(maxsize=None)
+def load_spec(format):
+    """Spec written by `manage.py export_schema`, read once per process"""
+    path = spec_path(format)
+    if not path.exists():
+        return None
+    content = path.read_bytes()
+    return content, SPEC_CONTENT_TYPES[format], quote_etag(sha256(content).hexdigest())
+
+
+def render_spec(request, format):
+    """Generates the spec live, once per host"""
+    key = _request_key(request, format)
+    if key not in _specs:
+        response = get_view(ui=False)(request, format=format)
+        response.render()
+        if response.status_code != 200:
+            return response
+        _specs[key] = (response.content, response["Content-Type"], quote_etag(sha256(response.content).hexdigest()))
+    return _specs[key]
+
+
+def schema_spec(request, format):
+    """
+    JSON/YAML spec. Outside DEBUG only the exported file is served, in DEBUG
+    the spec is generated from the code so it follows local changes.
+    """
+    if format not in SPEC_CONTENT_TYPES:
+        raise Http404("Unknown schema format")
+    if settings.DEBUG:
+        spec = render_spec(request, format)
+        if isinstance(spec, HttpResponse):
+            return spec
+    else:
+        spec = load_spec(format)
+        if spec is None:
+            raise Http404("Schema isn't exported, run `manage.py export_schema`")
+
+    content, content_type, etag = spec
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+    response.headers["ETag"] = etag
+    return response
+
+
+def schema_ui(request):
+    return get_view(ui=True)(request)
@@ -1,31 +1,68 @@
-import base64
-import uuid
+from functools import cached_property
+from operator import attrgetter
 
+from django.conf import settings
 from django.contrib.auth.models import update_last_login
-from django.core.files.base import ContentFile
-from django.db import IntegrityError
-from rest_framework.exceptions import APIException
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
 
 from rest_framework.serializers import (
     Serializer, UUIDField, ModelSerializer,
-    SerializerMethodField, CharField, ImageField
+    SerializerMethodField, CharField, ImageField, IntegerField, DateField, ListField
 )
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.settings import api_settings
 
 from api.models import Link, Task, VUser, Volunteer, Unit, Comment
+from api.storage import decode_base64
 
 
 class Base64ImageField(ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format_, img_str = data.split(';base64,')
-            name, ext = str(uuid.uuid4().urn[9:]), format_.split('/')[-1]
-            data = ContentFile(base64.b64decode(img_str), name=name + '.' + ext)
+            try:
+                format_, img_str = data.split(';base64,')
+                data = decode_base64(img_str, name='image.' + format_.split('/')[-1])
+            except ValueError:  # binascii.Error included
+                raise ValidationError("Invalid base64 image")
         return super(Base64ImageField, self).to_internal_value(data)
 
 
-class VUserSerializer(ModelSerializer):
+class CachedFieldsMixin:
+    """
+    Resolves the readable fields once per serializer instead of once per object.
+    Plain model columns are read through a precompiled attrgetter, everything
+    else goes through the field's own `get_attribute`, so the output is the
+    same as ModelSerializer.to_representation gives.
+    """
+
+    @cached_property
+    def _field_accessors(self):
+        columns = {field.attname for field in self.Meta.model._meta.concrete_fields}
+        accessors = []
+        for field in self._readable_fields:
+            attrs = field.source_attrs
+            if len(attrs) == 1 and attrs[0] in columns and not isinstance(field, Serializer):
+                accessors.append((field.field_name, attrgetter(attrs[0]), field.to_representation))
+            else:
+                accessors.append((field.field_name, field.get_attribute, field.to_representation))
+        return accessors
+
+    def to_representation(self, instance):
+        ret = {}
+        for name, get_attribute, to_representation in self._field_accessors:
+            try:
+                attribute = get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            ret[name] = None if check_for_none is None else to_representation(attribute)
+        return ret
+
+
+class VUserSerializer(CachedFieldsMixin, ModelSerializer):
 
     username = CharField(required=True, write_only=True, max_length=50)
 
@@ -37,7 +74,7 @@ class VUserSerializer(ModelSerializer):
             user.set_password(password)
             user.save()
         except IntegrityError as e:
-            raise APIException({"detail": str(e)}, 400)
+            raise ValidationError({"detail": str(e)})
         self.validated_data.pop("username")
         return user
 
@@ -52,7 +89,7 @@ class VUserSerializer(ModelSerializer):
         )
 
 
-class UnitSerializer(ModelSerializer):
+class UnitSerializer(CachedFieldsMixin, ModelSerializer):
 
     class Meta:
         model = Unit
@@ -62,7 +99,7 @@ class UnitSerializer(ModelSerializer):
         )
 
 
-class VolunteerReadSerializer(ModelSerializer):
+class VolunteerReadSerializer(CachedFieldsMixin, ModelSerializer):
     unit = UnitSerializer(source="link.unit", read_only=True)
     user = VUserSerializer(read_only=True)
 
@@ -76,7 +113,7 @@ class VolunteerReadSerializer(ModelSerializer):
         )
 
 
-class VolunteerSerializer(ModelSerializer):
+class VolunteerSerializer(CachedFieldsMixin, ModelSerializer):
 
     code = UUIDField(required=True, write_only=True)
     user = VUserSerializer()
@@ -84,20 +121,24 @@ class VolunteerSerializer(ModelSerializer):
 
     def create(self, validated_data):
         code = self.validated_data.pop("code")
-        link = Link.objects.filter(code=code).first()
-        if not link or not link.is_open:
-            raise APIException({"code": "Not found or locked"}, 404)
-
-        user_serializer = VUserSerializer(data=self.validated_data.pop("user"))
-        user = user_serializer.save(password=str(code))
-
-        try:
-            volunteer = Volunteer(**self.validated_data, user=user)
-            volunteer.link, volunteer.user = link, user
-            volunteer.save()
-        except IntegrityError as e:
-            user.delete()
-            raise APIException({"detail": str(e)}, 400)
+        user_data = self.validated_data.pop("user")
+        with transaction.atomic():
+            # The row lock serialises concurrent registrations by the same code,
+            # the unique link constraint below catches whatever slips past the check.
+            link = Link.objects.select_related("unit", "volunteer").select_for_update(
+                of=("self",)
+            ).filter(code=code, unit__deleted_at__isnull=True).first()
+            if not link or hasattr(link, "volunteer"):
+                raise NotFound({"code": "Not found or locked"})
+
+            user_serializer = VUserSerializer(data=user_data)
+            user = user_serializer.save(password=str(code))
+
+            try:
+                volunteer = Volunteer(**self.validated_data, user=user, link=link)
+                volunteer.save()
+            except IntegrityError:
+                raise NotFound({"code": "Not found or locked"})
         self.validated_data["user"] = user_serializer.validated_data
         return volunteer
 
@@ -116,13 +157,33 @@ class VolunteerSerializer(ModelSerializer):
         )
 
 
-class TaskSerializer(ModelSerializer):
+class VolunteerScoreSerializer(CachedFieldsMixin, ModelSerializer):
+    """Leaderboard row, expects a queryset annotated with `with_score()`"""
+
+    user = VUserSerializer(read_only=True)
+    score = IntegerField(source="total_score", read_only=True)
+
+    class Meta:
+        model = Volunteer
+        fields = (
+            "user",
+            "avatar",
+            "score",
+        )
+
+
+class TaskSerializer(CachedFieldsMixin, ModelSerializer):
 
     creator = VUserSerializer(read_only=True)
     photo = SerializerMethodField()
 
     def get_photo(self, obj):
-        comment = obj.comments.filter(photo__isnull=False).first()
+        if hasattr(obj, "first_photo"):
+            if not obj.first_photo:
+                return None
+            url = Comment._meta.get_field("photo").storage.url(obj.first_photo)
+            return self.context["request"].build_absolute_uri(url)
+        comment = obj.comments.filter(photo__isnull=False).exclude(photo="").first()
         if comment:
             request = self.context["request"]
             return request.build_absolute_uri(comment.photo.url)
@@ -143,7 +204,7 @@ class TaskSerializer(ModelSerializer):
         )
 
 
-class CommentReadSerializer(ModelSerializer):
+class CommentReadSerializer(CachedFieldsMixin, ModelSerializer):
 
     volunteer = VolunteerReadSerializer(read_only=True)
     task = TaskSerializer(read_only=True)
@@ -175,12 +236,30 @@ class CommentSerializer(ModelSerializer):
         fields = ("text", "photo",)
 
 
+class DashboardSerializer(Serializer):
+
+    profile = VolunteerReadSerializer(read_only=True)
+    score = IntegerField(read_only=True)
+    rank = IntegerField(read_only=True)
+    unit_size = IntegerField(read_only=True)
+    upcoming = TaskSerializer(many=True, read_only=True)
+    completed = TaskSerializer(many=True, read_only=True)
+
+
+class UnitWeeklyStatsSerializer(Serializer):
+
+    week = DateField(read_only=True)
+    tasks_completed = IntegerField(read_only=True)
+    total_score = IntegerField(read_only=True)
+    comments = IntegerField(read_only=True)
+
+
 class VUserLoginSerializer(Serializer):
 
     code = UUIDField(required=True)
 
     def validate(self, attrs):
-        link = Link.objects.filter(code=attrs.get('code')).first()
+        link = Link.objects.filter(code=attrs.get('code'), unit__deleted_at__isnull=True).first()
         if not link or not hasattr(link, 'volunteer'):
             raise APIException({"message": "Code is invalid"}, 400)
         user = link.volunteer.user
@@ -193,3 +272,8 @@ class VUserLoginSerializer(Serializer):
         return {
             "access": str(token)
         }
+
+
+class BatchSerializer(Serializer):
+
+    requests = ListField(child=CharField(max_length=2048), min_length=1, max_length=settings.BATCH_MAX_REQUESTS)
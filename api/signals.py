@@ -1,6 +1,17 @@
 import os
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from api.authentication import user_cache_key
+from api.models import Comment, Volunteer, Rating, Task, dashboard_cache_key, mark_rollup_days
+from api.storage import is_content_addressed
+
+MEDIA_FIELDS = ["photo", "avatar"]
+# Task fields the rollup of its ratings depends on
+ROLLUP_TASK_FIELDS = ["date_end", "is_open", "score", "deleted_at"]
 
 
 def remove_file(path) -> bool:
@@ -11,24 +22,101 @@ def remove_file(path) -> bool:
     return False
 
 
+def remove_files(paths) -> int:
+    removed = 0
+    for path in paths:
+        if path:
+            try:
+                removed += remove_file(path)
+            except IsADirectoryError:
+                pass
+    return removed
+
+
+def referenced_files(paths) -> set:
+    """The paths some comment photo or volunteer avatar refers to"""
+    used = set(Comment.objects.filter(photo__in=paths).values_list("photo", flat=True))
+    used.update(Volunteer.objects.filter(avatar__in=paths).values_list("avatar", flat=True))
+    return used
+
+
+def release_files(paths) -> int:
+    """
+    Removes the files nothing refers to anymore. Content-addressed files can be
+    reused by an upload at any moment, they are left to `manage.py collect_media`.
+    """
+    paths = {str(path) for path in paths if path and not is_content_addressed(str(path))}
+    if not paths:
+        return 0
+    return remove_files(paths - referenced_files(paths))
+
+
+def release_after_commit(paths) -> None:
+    # References are counted once the row change is visible, a rollback keeps the files
+    paths = [str(path) for path in paths if path]
+    if paths:
+        transaction.on_commit(lambda: release_files(paths))
+
+
 def update_media(sender, instance, **kwargs) -> None:  # pylint: disable=unused-argument
-    if sender.objects.filter(id=instance.id).exists():
-        obj = sender.objects.get(id=instance.id)
-        files = filter(lambda field: hasattr(obj, field), ["image", "video"])
-        for file in files:
-            if getattr(obj, file) != getattr(instance, file):
-                try:
-                    remove_file(str(getattr(obj, file)))
-                except IsADirectoryError as error:
-                    pass
+    fields = [field for field in MEDIA_FIELDS if hasattr(instance, field)]
+    if instance.pk is None or not fields:
+        return
+    old = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    if old is not None:
+        # Released in post_save, the replaced file is still referenced by the row until then
+        instance._replaced_media = [old[field] for field in fields if old[field] != getattr(instance, field).name]
+
+
+def release_replaced_media(sender, instance, **kwargs) -> None:  # pylint: disable=unused-argument
+    release_after_commit(instance.__dict__.pop("_replaced_media", []))
 
 
 def delete_media(sender, instance, **kwargs) -> None:  # pylint: disable=unused-argument
-    if sender.objects.filter(id=instance.id).exists():
-        obj = sender.objects.get(id=instance.id)
-        files = filter(lambda field: hasattr(obj, field), ["photo", "avatar"])
-        for file in files:
-            try:
-                remove_file(str(getattr(obj, file)))
-            except IsADirectoryError as error:
-                pass
+    # The instance being deleted already holds the file names, no need to reload it
+    release_after_commit(getattr(instance, field) for field in MEDIA_FIELDS if hasattr(instance, field))
+
+
+def invalidate_user_cache(sender, instance, **kwargs) -> None:  # pylint: disable=unused-argument
+    user_id = instance.user_id if hasattr(instance, "user_id") else instance.pk
+    cache.delete(user_cache_key(user_id))
+
+
+def invalidate_dashboard(sender, instance, **kwargs) -> None:  # pylint: disable=unused-argument
+    volunteer_id = instance.volunteer_id if hasattr(instance, "volunteer_id") else instance.pk
+    cache.delete(dashboard_cache_key(volunteer_id))
+
+
+def invalidate_task_dashboards(sender, instance, **kwargs) -> None:  # pylint: disable=unused-argument
+    # Opening, closing or rescoring a task changes the scores of everyone signed up
+    if not settings.DASHBOARD_CACHE_TTL:
+        return
+    volunteer_ids = Rating.objects.filter(task_id=instance.pk).values_list("volunteer_id", flat=True)
+    cache.delete_many([dashboard_cache_key(volunteer_id) for volunteer_id in volunteer_ids])
+
+
+def touch_user_rows(sender, instance, created, update_fields=None, **kwargs) -> None:  # pylint: disable=unused-argument
+    # Listings show the user's names through volunteers and task creators, their ETags follow updated_at.
+    # Logins only write last_login, which nothing shows.
+    if created or (update_fields is not None and set(update_fields) <= {"last_login"}):
+        return
+    now = timezone.now()
+    Volunteer.objects.filter(user_id=instance.pk).update(updated_at=now)
+    Task.all_objects.filter(creator_id=instance.pk).update(updated_at=now)
+
+
+def mark_deleted_activity(sender, instance, **kwargs) -> None:  # pylint: disable=unused-argument
+    # A deleted row leaves nothing for the rollup's watermark to find, its day is recorded while it still exists
+    mark_rollup_days(sender.objects.filter(pk=instance.pk))
+
+
+def mark_task_rollup_days(sender, instance, update_fields=None, **kwargs) -> None:  # pylint: disable=unused-argument
+    # The rollup finds the task's new day by updated_at, the day it is counted in until now is recorded here
+    if instance.pk is None or (update_fields is not None and not set(update_fields) & set(ROLLUP_TASK_FIELDS)):
+        return
+    old = Task.all_objects.filter(pk=instance.pk).values(*ROLLUP_TASK_FIELDS).first()
+    if old is None or all(old[field] == getattr(instance, field) for field in ROLLUP_TASK_FIELDS):
+        return
+    mark_rollup_days(Rating.objects.filter(task_id=instance.pk))
+    if old["deleted_at"] != instance.deleted_at:
+        mark_rollup_days(Comment.objects.filter(task_id=instance.pk))
@@ -0,0 +1,76 @@
+import base64
+import hashlib
+import os
+import re
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Multiple of 4, so every base64 chunk decodes on its own
+DECODE_CHUNK_SIZE = 64 * 1024
+
+re_whitespace = re.compile(r"\s+")
+re_hashed_name = re.compile(r"(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}(\.\w+)?$")
+
+
+class HashedContentFile(ContentFile):
+    """ContentFile which already knows the sha256 of its bytes"""
+
+    def __init__(self, content, digest: str, name=None):
+        super().__init__(content, name=name)
+        self.sha256 = digest
+
+
+def decode_base64(data: str, name: str) -> HashedContentFile:
+    """
+    Decodes chunk by chunk and hashes the bytes on the way, so the upload is read
+    once. Raises binascii.Error for anything but base64 and whitespace.
+    """
+    # Line breaks (e.g. from base64.encodebytes) would shift the chunks off the 4 character groups
+    data = re_whitespace.sub("", data)
+    digest, content = hashlib.sha256(), bytearray()
+    for start in range(0, len(data), DECODE_CHUNK_SIZE):
+        chunk = base64.b64decode(data[start:start + DECODE_CHUNK_SIZE], validate=True)
+        digest.update(chunk)
+        content += chunk
+    return HashedContentFile(bytes(content), digest.hexdigest(), name=name)
+
+
+def file_digest(content) -> str:
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_content_addressed(name: str) -> bool:
+    """Whether the file was named by HashedFileSystemStorage, so its content never changes"""
+    return re_hashed_name.search(name) is not None
+
+
+@deconstructible
+class HashedFileSystemStorage(FileSystemStorage):
+    """
+    Names files by the sha256 of their content inside the upload_to directory,
+    identical uploads share one file and a stored file never changes. Since
+    several rows may point to one file and an upload may reuse a file before its
+    row is committed, unreferenced files are only removed by `manage.py collect_media`
+    after they were left untouched for a grace period.
+    """
+
+    def save(self, name, content, max_length=None):
+        digest = getattr(content, "sha256", None) or file_digest(content)
+        directory, ext = os.path.dirname(name), os.path.splitext(name)[1].lower()
+        name = os.path.join(directory, digest[:2], digest + ext)
+        if self.exists(name):
+            try:
+                # A fresh mtime marks the file as in use, collect_media skips it
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass  # Collected meanwhile, written again
+        return super().save(name, content, max_length)
+
+
+hashed_storage = HashedFileSystemStorage()
@@ -0,0 +1,38 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import VUser, Unit, Task, Link, Volunteer
+
+
+def create_unit(username: str = "creator") -> Unit:
+    creator = VUser.objects.create(username=username, is_staff=True)
+    return Unit.objects.create(creator=creator, title="Unit", description="")
+
+
+def create_task(unit: Unit, **fields) -> Task:
+    """A closed task of the unit worth one point, ending now"""
+    now = timezone.now()
+    fields = {"score": 1, "date_start": now, "date_end": now, "is_open": False, **fields}
+    return Task.objects.create(title="Task", description="", creator=unit.creator, unit=unit, **fields)
+
+
+def create_volunteer(unit: Unit, username: str) -> Volunteer:
+    return Volunteer.objects.create(
+        user=VUser.objects.create(username=username), link=Link.objects.create(unit=unit)
+    )
+
+
+class UnitTestCase(TestCase):
+    """Starts from a unit with its creator, one closed task and one volunteer"""
+
+    def setUp(self):
+        self.unit = create_unit()
+        self.creator = self.unit.creator
+        self.task = create_task(self.unit)
+        self.volunteer = create_volunteer(self.unit, "volunteer")
+
+    def create_task(self, **fields) -> Task:
+        return create_task(self.unit, **fields)
+
+    def create_volunteer(self, username: str) -> Volunteer:
+        return create_volunteer(self.unit, username)
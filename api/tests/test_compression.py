@@ -0,0 +1,22 @@
+from unittest import skipIf
+
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from api.middleware import CompressionMiddleware, brotli
+
+
+@skipIf(brotli is None, "brotli isn't installed")
+class CompressionMiddlewareTest(SimpleTestCase):
+
+    def compress(self, response):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip, br")
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_json_uses_brotli(self):
+        response = self.compress(JsonResponse({"items": ["item"] * 1000}))
+        self.assertEqual(response["Content-Encoding"], "br")
+
+    def test_html_uses_padded_gzip(self):
+        response = self.compress(HttpResponse("<p>page</p>" * 1000, content_type="text/html"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
@@ -0,0 +1,45 @@
+from rest_framework.test import APIClient
+
+from api.models import Unit, Rating, Comment
+from api.tests.base import UnitTestCase
+
+
+class ConditionalListTest(UnitTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def revalidate(self, url: str, change) -> int:
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def rename(self, user):
+        user.first_name = "New"
+        user.save()
+
+    def test_volunteer_rename(self):
+        self.assertEqual(self.revalidate("/api/volunteer/", lambda: self.rename(self.volunteer.user)), 200)
+
+    def test_task_creator_rename(self):
+        self.assertEqual(self.revalidate("/api/task/", lambda: self.rename(self.creator)), 200)
+
+    def test_deleted_comment(self):
+        comment = Comment.objects.create(task=self.task, volunteer=self.volunteer, text="")
+        self.assertEqual(self.revalidate("/api/task/", comment.delete), 200)
+
+    def test_no_last_modified(self):
+        response = self.client.get("/api/task/")
+        self.assertNotIn("Last-Modified", response)
+
+    def test_deleted_task_score(self):
+        Rating.objects.create(task=self.task, volunteer=self.volunteer)
+        self.client.force_authenticate(self.creator)
+        url = f"/api/unit/{self.unit.pk}/volunteer/"
+        self.assertEqual(self.revalidate(url, self.task.delete), 200)
+
+    def test_deleted_unit_tasks(self):
+        Rating.objects.create(task=self.task, volunteer=self.volunteer)
+        self.assertEqual(self.revalidate("/api/volunteer/", Unit.objects.filter(pk=self.unit.pk).delete), 200)
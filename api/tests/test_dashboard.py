@@ -0,0 +1,22 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import UnitTestCase
+
+
+class TaskDashboardInvalidationTest(UnitTestCase):
+
+    def rating_queries(self) -> list:
+        with CaptureQueriesContext(connection) as queries:
+            self.task.title = "Renamed"
+            self.task.save()
+        return [query["sql"] for query in queries if "api_rating" in query["sql"]]
+
+    @override_settings(DASHBOARD_CACHE_TTL=0)
+    def test_no_queries_without_cache(self):
+        self.assertEqual(self.rating_queries(), [])
+
+    @override_settings(DASHBOARD_CACHE_TTL=60)
+    def test_signed_up_dashboards_are_dropped(self):
+        self.assertEqual(len(self.rating_queries()), 1)
@@ -0,0 +1,45 @@
+from django.test import SimpleTestCase
+from rest_framework.test import APIClient
+
+from api.export import stream_csv
+from api.models import VUser, Comment
+from api.tests.base import UnitTestCase, create_unit
+
+
+class StreamCSVTest(SimpleTestCase):
+
+    def test_formulas_are_escaped(self):
+        rows = [("=HYPERLINK(\"http://example.com\")", "+1", "-1", "@SUM(A1)", "\tx", "plain", -1, None)]
+        content = b"".join(stream_csv("export.csv", ("a",) * 8, iter(rows)).streaming_content).decode()
+        self.assertEqual(
+            content.splitlines()[1],
+            "\"'=HYPERLINK(\"\"http://example.com\"\")\",'+1,'-1,'@SUM(A1),'\tx,plain,-1,"
+        )
+
+
+class ExportPermissionTest(UnitTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Comment.objects.create(task=self.task, volunteer=self.volunteer, text="Comment")
+        self.client = APIClient()
+
+    def status(self, user, query: str = "") -> int:
+        self.client.force_authenticate(user)
+        return self.client.get(f"/api/export/comments.csv{query}").status_code
+
+    def test_creator_exports_own_unit(self):
+        self.assertEqual(self.status(self.creator, f"?unit={self.unit.pk}"), 200)
+
+    def test_unit_is_required(self):
+        self.assertEqual(self.status(self.creator), 400)
+
+    def test_other_coordinator_is_rejected(self):
+        other = create_unit("other").creator
+        self.assertEqual(self.status(other, f"?unit={self.unit.pk}"), 403)
+        self.assertEqual(self.status(other, "?unit=0"), 404)
+
+    def test_superuser_exports_everything(self):
+        admin = VUser.objects.create(username="admin", is_staff=True, is_superuser=True)
+        self.assertEqual(self.status(admin), 200)
+        self.assertEqual(self.status(admin, f"?unit={self.unit.pk}"), 200)
@@ -0,0 +1,87 @@
+import base64
+import io
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.models import Comment
+from api.serializers import Base64ImageField
+from api.storage import decode_base64, hashed_storage
+from api.tests.base import UnitTestCase
+
+
+def png_bytes(color="red", size=(64, 64)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class DecodeBase64Test(TestCase):
+
+    def test_line_breaks(self):
+        # Bigger than one decode chunk, with a line break every 76 characters
+        content = os.urandom(160 * 1024)
+        decoded = decode_base64(base64.encodebytes(content).decode(), name="image.png")
+        self.assertEqual(decoded.read(), content)
+
+    def test_invalid_data_is_a_validation_error(self):
+        with self.assertRaises(ValidationError):
+            Base64ImageField().to_internal_value("data:image/png;base64,not*base64")
+
+
+class CollectMediaTest(UnitTestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        super().setUp()
+
+    def upload(self, color="red") -> str:
+        content = decode_base64(base64.b64encode(png_bytes(color)).decode(), name="image.png")
+        return hashed_storage.save("images/image.png", content)
+
+    def age(self, name: str, seconds: int = 2 * 60 * 60):
+        stamp = time.time() - seconds
+        os.utime(hashed_storage.path(name), (stamp, stamp))
+
+    def collect(self):
+        call_command("collect_media", stdout=StringIO())
+
+    def test_identical_uploads_share_a_file(self):
+        self.assertEqual(self.upload(), self.upload())
+
+    def test_reuse_refreshes_the_file(self):
+        name = self.upload()
+        self.age(name)
+        self.upload()
+        self.collect()
+        self.assertTrue(hashed_storage.exists(name))
+
+    def test_deleted_comment_keeps_file_until_collected(self):
+        name = self.upload()
+        comment = Comment.objects.create(task=self.task, volunteer=self.volunteer, text="", photo=name)
+        comment.delete()
+        self.assertTrue(hashed_storage.exists(name))
+
+        self.age(name)
+        self.collect()
+        self.assertFalse(hashed_storage.exists(name))
+
+    def test_referenced_and_recent_files_are_kept(self):
+        used, recent = self.upload("red"), self.upload("blue")
+        Comment.objects.create(task=self.task, volunteer=self.volunteer, text="", photo=used)
+        self.age(used)
+        self.collect()
+        self.assertTrue(hashed_storage.exists(used))
+        self.assertTrue(hashed_storage.exists(recent))
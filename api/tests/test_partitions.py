@@ -0,0 +1,74 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from api.models import Volunteer, Rating, Comment
+from api.partitions import PARTITIONED_TABLES, add_months, is_partitioned, month_start, partition_name, partition_table
+from api.tests.base import UnitTestCase
+
+
+@skipUnless(connection.vendor == "postgresql", "Partitioning needs PostgreSQL")
+class PartitionTableTest(UnitTestCase):
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.volunteers = [self.create_volunteer(f"volunteer{i}") for i in range(3)]
+        self.ratings = [Rating.objects.create(task=self.task, volunteer=volunteer) for volunteer in self.volunteers]
+        Comment.objects.create(task=self.task, volunteer=self.volunteers[0], text="Comment")
+        # One sign-up three months back, so there is an old partition to detach
+        self.old_month = add_months(month_start(now), -3)
+        Rating.objects.filter(pk=self.ratings[0].pk).update(created_at=self.old_month + timedelta(days=1))
+
+        for table, unique in PARTITIONED_TABLES.items():
+            self.assertTrue(partition_table(connection, table, unique))
+
+    def test_rows_are_copied(self):
+        with connection.cursor() as cursor:
+            for table in PARTITIONED_TABLES:
+                self.assertTrue(is_partitioned(cursor, table))
+        self.assertEqual(
+            set(Rating.objects.values_list("pk", flat=True)), {rating.pk for rating in self.ratings}
+        )
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Volunteer.objects.with_score().get(pk=self.volunteers[0].pk).total_score, 1)
+
+    def test_sequence_continues(self):
+        rating = Rating.objects.create(task=self.task, volunteer=self.create_volunteer("late"))
+        self.assertEqual(rating.pk, max(rating.pk for rating in self.ratings) + 1)
+
+    def test_partitioning_again_is_a_noop(self):
+        self.assertFalse(partition_table(connection, "api_rating", PARTITIONED_TABLES["api_rating"]))
+
+    def test_duplicate_rating_is_rejected(self):
+        with self.assertRaisesMessage(IntegrityError, "duplicate key"), transaction.atomic():
+            Rating.objects.create(task=self.task, volunteer=self.volunteers[1])
+        self.assertEqual(Rating.objects.filter(volunteer=self.volunteers[1]).count(), 1)
+
+    def test_manage_partitions(self):
+        current = month_start(timezone.now())
+        call_command("manage_partitions", ahead=5, detach_older_than=2, stdout=StringIO())
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [partition_name("api_rating", add_months(current, 5))])
+            self.assertIsNotNone(cursor.fetchone()[0])
+            cursor.execute(f'SELECT count(*) FROM "{partition_name("api_rating", self.old_month)}"')
+            self.assertEqual(cursor.fetchone()[0], 1)
+        # The detached month is no longer part of the table
+        self.assertFalse(Rating.objects.filter(pk=self.ratings[0].pk).exists())
+        self.assertEqual(Rating.objects.count(), 2)
+
+    def test_rows_in_default_partition_move_to_new_month(self):
+        far = add_months(month_start(timezone.now()), 8)
+        Rating.objects.filter(pk=self.ratings[1].pk).update(created_at=far + timedelta(days=2))
+        call_command("manage_partitions", ahead=8, stdout=StringIO())
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM "api_rating_default"')
+            self.assertEqual(cursor.fetchone()[0], 0)
+            cursor.execute(f'SELECT count(*) FROM "{partition_name("api_rating", far)}"')
+            self.assertEqual(cursor.fetchone()[0], 1)
@@ -0,0 +1,65 @@
+import threading
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from api.models import VUser, Link, Volunteer
+from api.tests.base import create_unit
+
+
+def register(code, username: str) -> int:
+    response = APIClient().post("/api/my/", {
+        "code": str(code),
+        "user": {"username": username, "first_name": "Racer", "last_name": "", "email": ""},
+    }, format="json")
+    return response.status_code
+
+
+class RegistrationTest(TestCase):
+
+    def setUp(self):
+        self.link = Link.objects.create(unit=create_unit())
+
+    def test_code_is_used_once(self):
+        self.assertEqual(register(self.link.code, "first"), 200)
+        self.assertEqual(register(self.link.code, "second"), 404)
+        self.assertFalse(VUser.objects.filter(username="second").exists())
+
+    def test_taken_username_is_a_client_error(self):
+        other = Link.objects.create(unit=self.link.unit)
+        self.assertEqual(register(self.link.code, "first"), 200)
+        self.assertEqual(register(other.code, "first"), 400)
+        self.assertFalse(hasattr(Link.objects.get(pk=other.pk), "volunteer"))
+
+    def test_deleted_unit_is_closed(self):
+        self.link.unit.delete()
+        self.assertEqual(register(self.link.code, "first"), 404)
+
+
+@skipUnless(connection.vendor == "postgresql", "Needs row locks, SQLite serializes every write")
+class ParallelRegistrationTest(TransactionTestCase):
+
+    racers = 8
+
+    def test_one_registration_per_code(self):
+        link = Link.objects.create(unit=create_unit())
+        barrier, statuses = threading.Barrier(self.racers), []
+
+        def race(number: int):
+            try:
+                barrier.wait()
+                statuses.append(register(link.code, f"racer{number}"))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=race, args=(number,)) for number in range(self.racers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [200] + [404] * (self.racers - 1))
+        self.assertEqual(VUser.objects.filter(username__startswith="racer").count(), 1)
+        self.assertEqual(Volunteer.objects.filter(link=link).count(), 1)
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.models import Unit, Task, Rating, Comment, UnitDailyStats, RollupDirtyDay
+from api.tests.base import UnitTestCase
+
+
+class RollupDeletionTest(UnitTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.rating = Rating.objects.create(task=self.task, volunteer=self.volunteer)
+        self.comment = Comment.objects.create(task=self.task, volunteer=self.volunteer, text="Comment")
+        self.rollup_all()
+
+    def rollup_all(self) -> None:
+        call_command("rollup_stats", overlap=0, stdout=StringIO())
+
+    def rollup(self) -> UnitDailyStats:
+        self.rollup_all()
+        return UnitDailyStats.objects.get(unit=self.unit)
+
+    def test_counts(self):
+        stats = UnitDailyStats.objects.get(unit=self.unit)
+        self.assertEqual((stats.tasks_completed, stats.total_score, stats.comments), (1, 1, 1))
+
+    def test_deleted_rating(self):
+        self.rating.delete()
+        self.assertTrue(RollupDirtyDay.objects.filter(unit=self.unit, date=self.task.date_end.date()).exists())
+        stats = self.rollup()
+        self.assertEqual((stats.tasks_completed, stats.total_score), (0, 0))
+        self.assertFalse(RollupDirtyDay.objects.exists())
+
+    def test_deleted_comment(self):
+        self.comment.delete()
+        self.assertEqual(self.rollup().comments, 0)
+
+    def test_purged_comments(self):
+        Task.objects.filter(pk=self.task.pk).delete()
+        Task.all_objects.filter(pk=self.task.pk).update(deleted_at=timezone.now() - timedelta(days=30))
+        call_command("purge_deleted", stdout=StringIO())
+        self.assertFalse(Comment.objects.exists())
+        stats = self.rollup()
+        self.assertEqual((stats.tasks_completed, stats.comments), (0, 0))
+
+    def test_moved_task(self):
+        self.task.date_end -= timedelta(days=1)
+        self.task.save()
+        self.rollup_all()
+        counted = UnitDailyStats.objects.filter(unit=self.unit, tasks_completed__gt=0)
+        self.assertEqual(list(counted.values_list("date", flat=True)), [self.task.date_end.date()])
+
+    def test_soft_deleted_task(self):
+        self.task.delete()
+        stats = self.rollup()
+        self.assertEqual((stats.tasks_completed, stats.comments), (0, 0))
+
+    def test_soft_deleted_unit_tasks(self):
+        Unit.objects.filter(pk=self.unit.pk).delete()
+        self.assertTrue(RollupDirtyDay.objects.filter(unit=self.unit).exists())
+        stats = self.rollup()
+        self.assertEqual((stats.tasks_completed, stats.comments), (0, 0))
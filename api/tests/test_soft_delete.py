@@ -0,0 +1,132 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import VUser, Unit, Task, Link, Volunteer, Rating, Comment, RollupDirtyDay
+from api.tests.base import UnitTestCase
+
+
+class SoftDeleteManagerTest(UnitTestCase):
+
+    def test_deleted_unit_hides_its_tasks(self):
+        self.unit.delete()
+        self.assertFalse(Unit.objects.exists())
+        self.assertFalse(Task.objects.exists())
+        self.assertTrue(Unit.all_objects.filter(pk=self.unit.pk, deleted_at__isnull=False).exists())
+        self.assertTrue(Task.all_objects.filter(pk=self.task.pk, deleted_at__isnull=False).exists())
+
+    def test_queryset_delete(self):
+        Unit.objects.filter(pk=self.unit.pk).delete()
+        self.assertFalse(Task.objects.exists())
+
+    def test_deleted_tasks_leave_the_score(self):
+        Rating.objects.create(task=self.task, volunteer=self.volunteer)
+        self.assertEqual(Volunteer.objects.with_score().get().total_score, 1)
+        self.task.delete()
+        self.assertEqual(Volunteer.objects.with_score().get().total_score, 0)
+
+
+class SoftDeleteAccessTest(UnitTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Rating.objects.create(task=self.task, volunteer=self.volunteer)
+        Comment.objects.create(task=self.task, volunteer=self.volunteer, text="Comment")
+        self.client = APIClient()
+
+    def test_login_by_link_of_deleted_unit(self):
+        self.assertIn("access", self.client.post(f"/api/token/{self.volunteer.link.code}/").data)
+        self.unit.delete()
+        self.assertNotIn("access", self.client.post(f"/api/token/{self.volunteer.link.code}/").data)
+
+    def test_volunteers_of_deleted_unit(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.volunteer.user)}")
+        self.assertEqual(len(self.client.get("/api/volunteer/").data), 1)
+        self.assertEqual(self.client.get("/api/my/dashboard/").status_code, 200)
+        self.unit.delete()
+        self.assertEqual(self.client.get("/api/volunteer/").data, [])
+        for url in ("/api/my/", "/api/my/dashboard/"):
+            self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.post(f"/api/my/task/{self.create_task().pk}/").status_code, 403)
+
+    def test_unit_comments_skip_deleted_tasks(self):
+        self.client.force_authenticate(self.creator)
+        self.assertEqual(len(self.client.get(f"/api/unit/{self.unit.pk}/comment/").data), 1)
+        self.task.delete()
+        self.assertEqual(len(self.client.get(f"/api/unit/{self.unit.pk}/comment/").data), 0)
+
+    def export(self, url: str) -> list:
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode().splitlines()[1:]
+
+    def test_exports_skip_deleted_rows(self):
+        self.client.force_authenticate(VUser.objects.create(username="admin", is_staff=True, is_superuser=True))
+        participants = f"/api/export/task/{self.task.pk}/participants.csv"
+        self.assertEqual(len(self.export("/api/export/comments.csv")), 1)
+        self.assertEqual(len(self.export(participants)), 1)
+        self.task.delete()
+        self.assertEqual(self.export("/api/export/comments.csv"), [])
+        self.assertEqual(self.export(participants), [])
+        self.assertEqual(len(self.export("/api/export/leaderboard.csv")), 1)
+        self.unit.delete()
+        self.assertEqual(self.export("/api/export/leaderboard.csv"), [])
+
+
+class PurgeDeletedTest(UnitTestCase):
+
+    def purge(self, batch_size: int = 2) -> str:
+        stdout = StringIO()
+        call_command("purge_deleted", f"--batch-size={batch_size}", stdout=stdout)
+        return stdout.getvalue()
+
+    def expire(self, queryset) -> None:
+        queryset.update(deleted_at=timezone.now() - timedelta(days=30))
+
+    def test_batches_cover_every_row(self):
+        volunteers = [self.volunteer] + [self.create_volunteer(f"volunteer{i}") for i in range(4)]
+        for volunteer in volunteers:
+            Rating.objects.create(task=self.task, volunteer=volunteer)
+            Comment.objects.create(task=self.task, volunteer=volunteer, text="Comment")
+        self.unit.delete()
+        self.expire(Unit.all_objects.all())
+        self.expire(Task.all_objects.all())
+
+        output = self.purge()
+        self.assertIn("api.Comment: 5 deleted", output)
+        self.assertIn("api.Rating: 5 deleted", output)
+        self.assertIn("api.Volunteer: 5 deleted", output)
+        for model in (Comment, Rating, Volunteer, Link):
+            self.assertFalse(model.objects.exists())
+        self.assertFalse(Task.all_objects.exists())
+        self.assertFalse(Unit.all_objects.exists())
+        self.assertEqual(VUser.objects.count(), 6)
+
+    def test_ratings_are_deleted_per_batch(self):
+        for i in range(30):
+            Rating.objects.create(task=self.task, volunteer=self.create_volunteer(f"volunteer{i}"))
+        self.task.delete()
+        self.expire(Task.all_objects.all())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIn("api.Rating: 30 deleted", self.purge(batch_size=1000))
+        self.assertLess(len(queries), 30)
+        self.assertTrue(RollupDirtyDay.objects.filter(unit=self.unit).exists())
+
+    def test_recent_deletions_are_kept(self):
+        other = self.create_task()
+        Comment.objects.create(task=other, volunteer=self.volunteer, text="Comment")
+        self.task.delete()
+        other.delete()
+        self.expire(Task.all_objects.filter(pk=self.task.pk))
+
+        self.purge()
+        self.assertEqual(list(Task.all_objects.values_list("pk", flat=True)), [other.pk])
+        self.assertTrue(Comment.objects.filter(task=other).exists())
+        self.assertTrue(Unit.objects.filter(pk=self.unit.pk).exists())
@@ -0,0 +1,31 @@
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+
+from api.throttling import LocalBuckets, TokenBucketThrottle
+
+
+class LinkCodeView:
+    throttle_scope = "link_code"
+
+
+class TokenBucketThrottleTest(SimpleTestCase):
+
+    def setUp(self):
+        self.buckets = LocalBuckets()
+        self.factory = APIRequestFactory()
+
+    def allowed(self, **meta) -> bool:
+        request = Request(self.factory.post("/api/token/code/", **meta))
+        return TokenBucketThrottle(self.buckets).allow_request(request, LinkCodeView())
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        results = [self.allowed(HTTP_X_FORWARDED_FOR=f"10.0.0.{i}") for i in range(12)]
+        self.assertEqual(results.count(True), 10)
+
+    @override_settings(REST_FRAMEWORK={"NUM_PROXIES": 1, "DEFAULT_THROTTLE_RATES": {"link_code": "10/min"}})
+    def test_proxy_address_is_taken_from_the_last_hop(self):
+        # The client controls everything before the address the proxy appended
+        results = [self.allowed(HTTP_X_FORWARDED_FOR=f"10.0.0.{i}, 192.0.2.1") for i in range(12)]
+        self.assertEqual(results.count(True), 10)
+        self.assertTrue(self.allowed(HTTP_X_FORWARDED_FOR="192.0.2.2"))
@@ -0,0 +1,112 @@
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate: str) -> tuple:
+    """'120/min' -> (capacity, tokens refilled per second)"""
+    num, period = rate.split('/')
+    duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+    return int(num), int(num) / duration
+
+
+class LocalBuckets:
+    """Buckets kept in the worker's memory, exact but not shared between processes"""
+
+    max_size = 100_000
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, refill: float) -> float:
+        """Takes a token, returns 0 on success or the seconds until one is available"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, stamp, _ = self.buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - stamp) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Full buckets carry no state, they are dropped once the table grows too big
+            self.buckets[key] = (tokens, now, now + (capacity - tokens) / refill)
+            if len(self.buckets) > self.max_size:
+                self.buckets = {k: v for k, v in self.buckets.items() if v[2] > now}
+        return 0 if allowed else (1 - tokens) / refill
+
+
+class CacheBuckets:
+    """
+    Buckets kept in a Django cache shared by all workers. The read-modify-write
+    isn't atomic, concurrent requests of one client may both get the last token.
+    Clients refused recently are refused again from memory without a cache hit.
+    """
+
+    def __init__(self, alias: str):
+        self.cache = caches[alias]
+        self.blocked = {}
+
+    def consume(self, key: str, capacity: int, refill: float) -> float:
+        now = time.time()
+        blocked_until = self.blocked.get(key)
+        if blocked_until is not None:
+            if blocked_until > now:
+                return blocked_until - now
+            self.blocked.pop(key, None)
+
+        tokens, stamp = self.cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - stamp) * refill)
+        timeout = int(capacity / refill) + 1
+        if tokens >= 1:
+            self.cache.set(key, (tokens - 1, now), timeout)
+            return 0
+        self.cache.set(key, (tokens, now), timeout)
+        wait = (1 - tokens) / refill
+        if len(self.blocked) > LocalBuckets.max_size:
+            self.blocked = {k: until for k, until in self.blocked.items() if until > now}
+        self.blocked[key] = now + wait
+        return wait
+
+
+@lru_cache(maxsize=None)
+def get_buckets(backend: str):
+    if backend == "local":
+        return LocalBuckets()
+    return CacheBuckets(backend)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket per client and route. The route budget is looked up in
+    DEFAULT_THROTTLE_RATES by the view's `throttle_scope` ("default" if unset),
+    a budget of "120/min" allows bursts of 120 requests and refills 2 per second.
+    Authenticated clients are keyed by user, anonymous ones by address. The
+    address is REMOTE_ADDR unless NUM_PROXIES says how many proxies in front
+    append to X-Forwarded-For, a client can't pick its own identity either way.
+    THROTTLE_BACKEND is "local" for in-process buckets or a cache alias.
+    """
+
+    def __init__(self, buckets=None):
+        self.buckets = buckets or get_buckets(settings.THROTTLE_BACKEND)
+        self.delay = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", "default")
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+
+        user = request.user
+        ident = f"user:{user.pk}" if user and user.is_authenticated else self.get_ident(request)
+        capacity, refill = parse_rate(rate)
+        self.delay = self.buckets.consume(f"throttle:{scope}:{ident}", capacity, refill)
+        return self.delay == 0
+
+    def wait(self):
+        return self.delay
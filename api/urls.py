@@ -1,18 +1,18 @@
 from django.urls import path
 from django.urls.conf import include
 
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from drf_yasg.generators import OpenAPISchemaGenerator
-
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework.permissions import AllowAny
 
 from api.api import (
     VolunteerApi, LinkApiView, TaskApi,
     TokenObtainByLink, MyTaskApi,
-    ManageTaskApi, MyApi, CommentApi
+    ManageTaskApi, MyApi, CommentApi,
+    UnitTaskApi, UnitVolunteerApi, UnitCommentApi,
+    UnitAnalyticsApi, LeaderboardExportApi,
+    TaskParticipantsExportApi, CommentExportApi,
+    BatchApi, MyDashboardApi
 )
+from api.schema import schema_spec, schema_ui
 
 api_routes = [
     path("volunteer/", VolunteerApi.as_view()),
@@ -21,35 +21,23 @@ api_routes = [
     path("comment/task/<int:task_id>/", CommentApi.as_view()),
     path("my/task/", MyTaskApi.as_view()),
     path("my/task/<int:task_id>/", ManageTaskApi.as_view()),
-    path("my/", MyApi.as_view())
+    path("my/", MyApi.as_view()),
+    path("my/dashboard/", MyDashboardApi.as_view()),
+    path("unit/<int:unit_id>/task/", UnitTaskApi.as_view()),
+    path("unit/<int:unit_id>/volunteer/", UnitVolunteerApi.as_view()),
+    path("unit/<int:unit_id>/comment/", UnitCommentApi.as_view()),
+    path("unit/<int:unit_id>/analytics/", UnitAnalyticsApi.as_view()),
+    path("export/leaderboard.csv", LeaderboardExportApi.as_view()),
+    path("export/task/<int:task_id>/participants.csv", TaskParticipantsExportApi.as_view()),
+    path("export/comments.csv", CommentExportApi.as_view()),
 ]
 
 
-SchemaView = get_schema_view(
-    openapi.Info(
-        title="Volunteer Api",
-        default_version="v1",
-        description="API to work with data from Database",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="bogdanbelenesku@gmail.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    generator_class=OpenAPISchemaGenerator,
-    public=True,
-    permission_classes=[AllowAny],
-)
-
-
 urlpatterns = [
     path("", include(api_routes)),
+    path("batch/", BatchApi.as_view()),
     path("token/", TokenObtainPairView.as_view(), name="token_obtain"),
     path("token/<uuid:code>/", TokenObtainByLink.as_view(), name="token_obtain_by_link"),
-    path(
-        "swagger<format>/", SchemaView.without_ui(cache_timeout=0), name="schema-json"
-    ),
-    path(
-        "swagger/",
-        SchemaView.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
+    path("swagger<format>/", schema_spec, name="schema-json"),
+    path("swagger/", schema_ui, name="schema-swagger-ui"),
 ]
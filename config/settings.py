@@ -25,6 +25,10 @@ class Config(BaseSettings):
     postgres_password: str
     secret_key: str
     debug: bool
+    media_accel: str | None = None
+    partition_activity_tables: bool = False
+    num_proxies: int = 0
+    redis_url: str | None = None
 
     model_config = SettingsConfigDict(env_file=BASE_DIR / '.env')
 
@@ -59,6 +63,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -69,6 +75,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'config.urls'
 
+# Responses shorter than this are not worth compressing
+COMPRESSION_MIN_LENGTH = 1024
+COMPRESSION_BROTLI_QUALITY = 5
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -103,13 +113,55 @@ DATABASES = {
     }
 }
 
+# A cache shared by all workers. Without it every process has its own LocMemCache,
+# so caches invalidated by signals are only enabled with REDIS_URL set.
+SHARED_CACHE = cfg.redis_url is not None
+if SHARED_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': cfg.redis_url,
+        }
+    }
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.VolunteerJWTAuthentication',
+    ],
+    # api.renderers use orjson when it is installed and fall back to the stdlib otherwise,
+    # swap them for rest_framework.renderers.JSONRenderer / parsers.JSONParser to opt out
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Reverse proxies appending to X-Forwarded-For, 0 keys anonymous clients on REMOTE_ADDR.
+    # Left unset DRF would trust whatever X-Forwarded-For the client sends.
+    'NUM_PROXIES': cfg.num_proxies,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+    # Budgets per view `throttle_scope`: burst size / time to refill it
+    'DEFAULT_THROTTLE_RATES': {
+        'default': '600/min',
+        'task': '120/min',
+        'link_code': '10/min',
+    },
 }
 
+# Seconds an authenticated user (with volunteer, link and unit) stays cached, 0 disables it.
+# Deactivation and password changes have to reach every worker, hence only with a shared cache.
+AUTH_USER_CACHE_TTL = 30 if SHARED_CACHE else 0
+
+# "local" keeps token buckets per worker process, a cache alias shares them between workers.
+# Per process the budgets would be multiplied by the number of workers.
+THROTTLE_BACKEND = "default" if SHARED_CACHE else "local"
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Authorization': {
@@ -118,8 +170,22 @@ SWAGGER_SETTINGS = {
             'name': 'Authorization'
         }
     },
+    # The UI loads the same spec the gateway polls
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
 
+# Seconds a volunteer's /api/my/dashboard/ stays cached, rating and task changes drop it earlier.
+# Off without a shared cache, other workers would keep serving the dropped entry.
+DASHBOARD_CACHE_TTL = 60 if SHARED_CACHE else 0
+# Open and closed tasks listed on the dashboard, each
+DASHBOARD_TASK_LIMIT = 10
+
+# GET sub-requests one /api/batch/ call may carry
+BATCH_MAX_REQUESTS = 10
+
+# Written by `manage.py export_schema` at deploy time, served when DEBUG is off
+OPENAPI_SCHEMA_DIR = BASE_DIR / 'schema'
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=3),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -140,6 +206,14 @@ SIMPLE_JWT = {
 }
 
 
+# Partitions ratings and comments by month on PostgreSQL 13+ when migrating, see api.partitions,
+# `manage.py manage_partitions` has to run regularly (e.g. daily) to create the coming months
+PARTITION_ACTIVITY_TABLES = cfg.partition_activity_tables
+
+# Admin changelists of tables above this many rows show the planner's estimate instead of COUNT(*)
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -180,6 +254,17 @@ MEDIA_URL = '/media/'
 STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# How the front proxy takes over media transfers: None streams files from Django,
+# "x-accel-redirect" for nginx, MEDIA_ACCEL_PREFIX has to be an `internal` location
+# aliased to MEDIA_ROOT, "x-sendfile" for Apache mod_xsendfile and lighttpd
+MEDIA_ACCEL = cfg.media_accel
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Media under these prefixes is served to authenticated users only, e.g. ('comment/', 'volunteer/')
+# for files named by primary key, content-addressed names can't be guessed
+MEDIA_PRIVATE_PREFIXES = ()
+# Content-addressed files are cached as immutable for a year, other files for this many seconds
+MEDIA_CACHE_MAX_AGE = 3600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -20,12 +20,14 @@ from django.contrib import admin
 from django.urls import path
 from django.urls.conf import include
 
+from api.media import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path(f'{settings.MEDIA_URL.strip("/")}/<path:path>', serve_media, name='media'),
 ]
 
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)